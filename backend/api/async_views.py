@@ -0,0 +1,148 @@
+"""
+Async views of read-heavy endpoints, served when `ASYNC_VIEWS` is on.
+
+Django 3.2 has no async ORM, so cache and database calls go through
+`sync_to_async`. Anonymous recipe reads answered from the response cache
+and catalog revalidations are handled without entering DRF, the rest is
+delegated to the regular viewsets.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import (Http404, HttpResponse, HttpResponseNotAllowed,
+                         HttpResponseNotModified)
+from django.shortcuts import redirect
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from common.constants import JSON_MEDIA_TYPES
+from recipes.models import Recipe
+from .cache import get_cached_response_data, get_response_cache_key
+from .utils import get_catalog_etag
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def accepts_json(request):
+    """Check if DRF would render the response with `JSONRenderer`."""
+    url_format = request.GET.get('format')
+    if url_format is not None:
+        return url_format == JSONRenderer.format
+    return all(
+        media_type.split(';')[0].strip() in JSON_MEDIA_TYPES
+        for media_type in request.META.get('HTTP_ACCEPT', '*/*').split(',')
+    )
+
+
+def async_viewset_view(viewset, actions, fast_path=None):
+    """
+    Return async view of the viewset actions.
+
+    `fast_path` is a coroutine function tried first for JSON GET requests,
+    it returns `None` when the viewset has to answer the request.
+    """
+    sync_view = viewset.as_view(actions)
+
+    async def view(request, *args, **kwargs):
+        if (
+            fast_path is not None
+            and request.method == 'GET'
+            and accepts_json(request)
+        ):
+            response = await fast_path(request, *args, **kwargs)
+            if response is not None:
+                return response
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    view.cls = viewset
+    view.initkwargs = sync_view.initkwargs
+    view.actions = sync_view.actions
+    view.csrf_exempt = True
+    return view
+
+
+def anonymous_recipe_fast_path(action):
+    """Answer anonymous recipe reads from `AnonymousRecipeCacheMixin`."""
+
+    async def fast_path(request, *args, **kwargs):
+        if 'HTTP_AUTHORIZATION' in request.META:
+            return None
+        data = await sync_to_async(get_cached_response_data)(
+            get_response_cache_key(request, action)
+        )
+        if data is None:
+            return None
+        response = HttpResponse(
+            JSONRenderer().render(data),
+            content_type=JSONRenderer.media_type
+        )
+        response['Vary'] = 'Accept'
+        return response
+
+    return fast_path
+
+
+def catalog_fast_path(viewset):
+    """Answer `If-None-Match` of `TagIngredientViewSetMixin` catalogs."""
+
+    async def fast_path(request, *args, **kwargs):
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if not if_none_match:
+            return None
+        etag = await sync_to_async(get_catalog_etag)(
+            viewset.catalog_name,
+            request.get_full_path(),
+            JSONRenderer.format
+        )
+        if etag not in if_none_match and '*' not in if_none_match:
+            return None
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = viewset.cache_control
+        return response
+
+    return fast_path
+
+
+async def redirect_short_link(request, link_suffix):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD'))
+    recipe_id = await sync_to_async(
+        Recipe.objects.filter(
+            short_link=link_suffix
+        ).values_list('id', flat=True).first
+    )()
+    if recipe_id is None:
+        raise Http404('No Recipe matches the given query.')
+    return redirect(f'{settings.ABSOLUTE_DOMAIN}/recipes/{recipe_id}')
+
+
+recipe_list = async_viewset_view(
+    RecipeViewSet,
+    {'get': 'list', 'post': 'create'},
+    fast_path=anonymous_recipe_fast_path('list')
+)
+recipe_detail = async_viewset_view(
+    RecipeViewSet,
+    {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    },
+    fast_path=anonymous_recipe_fast_path('retrieve')
+)
+tag_list = async_viewset_view(
+    TagViewSet, {'get': 'list'}, fast_path=catalog_fast_path(TagViewSet)
+)
+tag_detail = async_viewset_view(
+    TagViewSet, {'get': 'retrieve'}, fast_path=catalog_fast_path(TagViewSet)
+)
+ingredient_list = async_viewset_view(
+    IngredientViewSet,
+    {'get': 'list'},
+    fast_path=catalog_fast_path(IngredientViewSet)
+)
+ingredient_detail = async_viewset_view(
+    IngredientViewSet,
+    {'get': 'retrieve'},
+    fast_path=catalog_fast_path(IngredientViewSet)
+)
@@ -0,0 +1,114 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import SAFE_METHODS
+
+
+def get_shared_token_key(key):
+    # Raw tokens are not used as keys of a possibly shared cache.
+    return f'auth_token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key to `(user, token)` with TTL.
+
+    With `TOKEN_CACHE_SHARED` entries are also kept in the default
+    Django cache, so other workers can skip the query too. Other
+    workers drop their local entries only by TTL, keep it short.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if settings.TOKEN_CACHE_SHARED:
+            value = cache.get(get_shared_token_key(key))
+            if value is not None:
+                self.set_local(key, value)
+                return value
+        return None
+
+    def set_local(self, key, value):
+        with self._lock:
+            expires_at = monotonic() + settings.TOKEN_CACHE_TTL
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        self.set_local(key, value)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                get_shared_token_key(key),
+                value,
+                timeout=settings.TOKEN_CACHE_SHARED_TTL
+            )
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if settings.TOKEN_CACHE_SHARED and keys:
+            cache.delete_many(map(get_shared_token_key, keys))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` which skips the token/user query on cache hit.
+
+    Entries are invalidated when the token is deleted (logout) and when
+    its user is changed, deactivated or deleted, see `api.signals`.
+    Counters are updated without signals, so the cached user is only a
+    snapshot for reads: unsafe requests may save `request.user` and
+    always load it from the database.
+    """
+
+    use_cache = True
+
+    def authenticate(self, request):
+        # DRF creates authenticators per request, the flag is not shared.
+        self.use_cache = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key) if self.use_cache else None
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            # Views may change `request.user`, cached instance stays intact.
+            token_cache.set(key, (copy.copy(user), token))
+            return user, token
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return copy.copy(user), token
@@ -0,0 +1,138 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from common.enums import CatalogNames
+from recipes.models import Ingredient
+from .utils import get_catalog_version
+
+UPPER_BOUND_CHAR = chr(0x10FFFF)
+
+
+def prefix_range(keys, prefix):
+    """Return `(lo, hi)` bounds of sorted `keys` starting with `prefix`."""
+    return (
+        bisect_left(keys, prefix),
+        bisect_right(keys, prefix + UPPER_BOUND_CHAR)
+    )
+
+
+class IngredientIndex:
+    """
+    Process-local autocomplete index over ingredient names.
+
+    Names are kept lowercased in a sorted array, so prefix lookups are
+    done with `bisect`. Every word of a name is kept in a sorted token
+    array as well, which serves multi-word queries like `?name=app j`.
+
+    The index is built lazily on the first search and rebuilt when the
+    ingredients catalog version (see `bump_catalog_version`) changes, so
+    it never lags behind the catalog `ETag`. `invalidate()` forces a
+    rebuild in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._state = None
+
+    def invalidate(self):
+        self._version = None
+
+    def build(self, version):
+        entries = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit
+            in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        tokens = sorted(
+            (token, position)
+            for position, entry in enumerate(entries)
+            for token in set(entry[0].split())
+        )
+        self._state = (
+            entries,
+            [entry[0] for entry in entries],
+            [token for token, _ in tokens],
+            [position for _, position in tokens],
+        )
+        self._version = version
+
+    def get_state(self):
+        # Read before the build, a bump during it triggers another one.
+        version = get_catalog_version(CatalogNames.INGREDIENTS.value)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.build(version)
+        return self._state
+
+    def search(self, terms, max_results=None):
+        """
+        Return ingredients matching every search term, best matches first.
+
+        Ranking:
+        1. the whole name starts with the query;
+        2. every term is a prefix of some word of the name;
+        3. every term is a substring of the name.
+
+        Matches of the same rank are ordered by name.
+
+        Args:
+            terms (list[str]): Search terms.
+            max_results (int | None): Maximum number of ingredients.
+
+        Returns:
+            list[Ingredient]: Unsaved instances built from the index.
+        """
+        entries, names, token_keys, token_positions = self.get_state()
+        terms = [term.lower() for term in terms]
+        found = []
+        seen = set()
+
+        def collect(positions):
+            for position in positions:
+                if position in seen:
+                    continue
+                seen.add(position)
+                found.append(position)
+                if max_results and len(found) >= max_results:
+                    return True
+            return False
+
+        lo, hi = prefix_range(names, ' '.join(terms))
+        if collect(range(lo, hi)):
+            return self.to_instances(entries, found)
+
+        word_matches = None
+        for term in terms:
+            lo, hi = prefix_range(token_keys, term)
+            positions = set(token_positions[lo:hi])
+            word_matches = (
+                positions if word_matches is None
+                else word_matches & positions
+            )
+        if collect(sorted(word_matches)):
+            return self.to_instances(entries, found)
+
+        collect(
+            position
+            for position, name in enumerate(names)
+            if all(term in name for term in terms)
+        )
+        return self.to_instances(entries, found)
+
+    @staticmethod
+    def to_instances(entries, positions):
+        return [
+            Ingredient(
+                id=entries[position][1],
+                name=entries[position][2],
+                measurement_unit=entries[position][3]
+            )
+            for position in positions
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,189 @@
+import threading
+from hashlib import md5
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.enums import CatalogNames
+from recipes.models import Tag
+from .utils import get_catalog_version, get_catalog_version_key
+
+RECIPES_GENERATION = 'recipes'
+CATALOG_VERSION_KEYS = {
+    get_catalog_version_key(catalog.value): catalog.value
+    for catalog in CatalogNames
+}
+
+
+def get_generation_key(name, pk=None):
+    """Return cache key of generation, e.g. `generation:author:1`."""
+    if pk is None:
+        return f'generation:{name}'
+    return f'generation:{name}:{pk}'
+
+
+def recipe_generation(pk):
+    """Recipe itself, its ingredients and counters."""
+    return get_generation_key('recipe', pk)
+
+
+def author_generation(pk):
+    """Profile of the author shown with recipes."""
+    return get_generation_key('author', pk)
+
+
+def author_recipes_generation(pk):
+    """Recipes of the author, lists filtered by `author`."""
+    return get_generation_key('author_recipes', pk)
+
+
+def tag_generation(pk):
+    """Recipes with the tag, lists filtered by `tags`."""
+    return get_generation_key('tag', pk)
+
+
+def bump_generations(keys):
+    """
+    Set new generation tokens after the transaction is committed.
+
+    Bumping on commit makes sure a concurrent request can not cache data
+    read before the commit under the new generation.
+    """
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many(
+                {key: uuid4().hex for key in keys}, timeout=None
+            )
+        )
+
+
+def get_generations(keys):
+    """
+    Return current tokens of generations, creating missing ones.
+
+    Missing catalog versions are created by `get_catalog_version`, so
+    they keep their `CATALOG_VERSION_TTL`.
+    """
+    generations = cache.get_many(keys)
+    missing = {}
+    for key in keys:
+        if key in generations:
+            continue
+        if key in CATALOG_VERSION_KEYS:
+            generations[key] = get_catalog_version(CATALOG_VERSION_KEYS[key])
+        else:
+            missing[key] = uuid4().hex
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+    return generations
+
+
+class TagCatalog:
+    """
+    In-process copy of the tag slug to id mapping.
+
+    Reloaded when the tags catalog version (see `bump_catalog_version`)
+    changes, so tag filters do not query `Tag` to resolve slugs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = {}
+
+    def get_ids(self, slugs):
+        version = get_catalog_version(CatalogNames.TAGS.value)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._ids = dict(Tag.objects.values_list('slug', 'pk'))
+                    self._version = version
+        ids = self._ids
+        return {ids[slug] for slug in slugs if slug in ids}
+
+
+tag_catalog = TagCatalog()
+
+
+def get_tag_ids(slugs):
+    """Map tag slugs to ids, unknown slugs are dropped."""
+    return tag_catalog.get_ids(slugs)
+
+
+def get_response_cache_key(request, action):
+    """
+    Build key of anonymous response from the normalized request.
+
+    Query params are sorted with their values and empty values are
+    dropped, so `?tags=b&tags=a&page=` and `?tags=a&tags=b` share a key.
+    Host is a part of the key as responses contain absolute URLs.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value != ''
+    )
+    digest = md5(
+        f'{request.scheme}://{request.get_host()}{request.path}?'
+        f'{urlencode(params)}'.encode()
+    ).hexdigest()
+    return f'recipe_response:{action}:{digest}'
+
+
+def get_recipe_dependencies(recipe_data):
+    """
+    Return generations serialized recipe depends on.
+
+    Names of tags and ingredients are covered by catalog versions.
+    """
+    keys = {
+        recipe_generation(recipe_data['id']),
+        get_catalog_version_key(CatalogNames.TAGS.value),
+        get_catalog_version_key(CatalogNames.INGREDIENTS.value),
+    }
+    if recipe_data.get('author'):
+        keys.add(author_generation(recipe_data['author']['id']))
+    return keys
+
+
+def get_list_filter_dependencies(request):
+    """
+    Return generations deciding which recipes are in the list.
+
+    Lists filtered by author or tags are invalidated only by changes
+    of that author or these tags, others by any recipe change.
+    """
+    keys = set()
+    author = request.GET.get('author')
+    if author:
+        keys.add(author_recipes_generation(author))
+    tags = request.GET.getlist('tags')
+    if tags:
+        keys.update(map(tag_generation, get_tag_ids(tags)))
+    if not keys:
+        keys.add(get_generation_key(RECIPES_GENERATION))
+    return keys
+
+
+def get_cached_response_data(cache_key):
+    """Return cached data if none of its generations has changed."""
+    entry = cache.get(cache_key)
+    if entry is None:
+        return None
+    generations, data = entry
+    if cache.get_many(generations) != generations:
+        return None
+    return data
+
+
+def set_cached_response_data(cache_key, data, generations):
+    """Cache data with generation tokens read before it was built."""
+    cache.set(
+        cache_key, (generations, data), timeout=settings.RECIPE_CACHE_TIMEOUT
+    )
@@ -1,13 +1,26 @@
-import operator
-from functools import reduce
-
 import django_filters
-from django.db import models
+from django import forms
+from django.db.models import Exists, OuterRef
 from rest_framework import filters
 
 from common.enums import RecipeRelatedFields
-from recipes.models import Recipe, Tag
-from .utils import filter_by_boolean
+from recipes.models import Recipe
+from .autocomplete import ingredient_index
+from .cache import get_tag_ids
+from .utils import filter_by_boolean, search_recipes
+
+
+class MultipleValueField(forms.Field):
+    """Field for repeated query params, e.g. `?tags=a&tags=b`."""
+
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [item for item in value or () if item]
+
+
+class MultipleValueFilter(django_filters.Filter):
+    field_class = MultipleValueField
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -17,25 +30,52 @@ class RecipeFilter(django_filters.FilterSet):
     - by author,
     - by tags,
     - whether they are favorited by user,
-    - whether they are in the user's shopping cart.
+    - whether they are in the user's shopping cart,
+    - by full-text search over name and text.
     """
 
     author = django_filters.NumberFilter(field_name='author__id')
-    tags = django_filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
+    tags = MultipleValueFilter(method='filter_tags')
     is_favorited = django_filters.CharFilter(
         method='filter_is_favorited'
     )
     is_in_shopping_cart = django_filters.CharFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search'
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Filter recipes having any of the given tags.
+
+        Slugs are resolved from the in-process tag catalog and matched
+        with a single `EXISTS` over the through table, so recipes are not
+        duplicated and need no `DISTINCT`.
+
+        Args:
+            queryset (QuerySet): The initial queryset of recipes.
+            name (str): The name of the filter.
+            value (list): Tag slugs, unknown ones are ignored.
+
+        Returns:
+            QuerySet: Recipes with at least one of the tags.
+        """
+        tag_ids = get_tag_ids(value)
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+                )
+            )
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         """
@@ -83,15 +123,31 @@ class RecipeFilter(django_filters.FilterSet):
             self.request.user.is_authenticated
         )
 
+    def filter_search(self, queryset, name, value):
+        """
+        Filter recipes matching the search query by name or text.
+
+        Args:
+            queryset (QuerySet): The initial queryset of recipes.
+            name (str): The name of the filter.
+            value (str): Search query, e.g. `борщ со сметаной`.
+
+        Returns:
+            QuerySet: Matching recipes ordered by relevance.
+        """
+        return search_recipes(queryset, value)
+
 
 class IngredientsSearchFilter(filters.SearchFilter):
     """
     Custom search filter for searching ingredients based on user input \
     upon creating new recipe.
 
-    This filter performs a case-insensitive search for ingredients that
-    match the provided search terms. It supports single-word and
-    multi-word searches.
+    Search is served from the in-memory `ingredient_index`, so it does
+    not hit the database. Results are limited with `max_results` of the
+    view and ranked: names starting with the query go first, then names
+    with words starting with every term, then names just containing
+    every term.
 
     1. **Single Word Search**:
        - Input: `?search=apple`
@@ -122,31 +178,15 @@ class IngredientsSearchFilter(filters.SearchFilter):
             view (View): The view that is handling the request.
 
         Returns:
-            QuerySet: The filtered queryset containing ingredients that
-            match the search terms.
+            QuerySet | list: The initial queryset if there are no search
+            terms, otherwise ranked list of ingredients that match
+            the search terms.
         """
-        search_fields = self.get_search_fields(view, request)
         search_terms = self.get_search_terms(request)
 
-        if not search_fields or not search_terms:
+        if not search_terms:
             return queryset
 
-        orm_lookups = [
-            f'{search_field}__icontains'
-            for search_field in search_fields
-        ]
-
-        conditions = []
-        for search_term in search_terms:
-            queries = [
-                models.Q(**{orm_lookup: search_term.lower()})
-                for orm_lookup in orm_lookups
-            ]
-            conditions.append(reduce(operator.or_, queries))
-
-        queryset = queryset.filter(reduce(operator.and_, conditions))
-
-        if self.must_call_distinct(queryset, search_fields):
-            queryset = queryset.distinct()
-
-        return queryset
+        return ingredient_index.search(
+            search_terms, getattr(view, 'max_results', None)
+        )
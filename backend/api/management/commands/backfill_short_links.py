@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils import generate_short_link
+from recipes.models import Recipe
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Assign short links to recipes that do not have one yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of recipes updated with one statement.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        recipe_ids = Recipe.objects.filter(
+            short_link__isnull=True
+        ).order_by('pk').values_list('pk', flat=True)
+
+        updated = 0
+        batch = []
+        for recipe_id in recipe_ids.iterator():
+            batch.append(
+                Recipe(pk=recipe_id, short_link=generate_short_link(recipe_id))
+            )
+            if len(batch) >= batch_size:
+                updated += self.update_batch(batch)
+                batch = []
+        if batch:
+            updated += self.update_batch(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully assigned {updated} short links.')
+        )
+
+    def update_batch(self, recipes):
+        Recipe.objects.bulk_update(recipes, ('short_link',))
+        return len(recipes)
@@ -0,0 +1,132 @@
+import json
+import sys
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from common.enums import IngredientFields, RecipeFields
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Export recipes with tags, ingredient amounts, author emails and '
+        'image paths as NDJSON, one recipe per line.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Path to output file, "-" writes to stdout.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of recipes read with one query.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        if options['output'] == '-':
+            exported = self.export(sys.stdout, batch_size)
+            # Keep stdout clean for the NDJSON stream.
+            summary = self.stderr
+        else:
+            try:
+                with open(
+                    options['output'], 'w', encoding='utf-8'
+                ) as file:
+                    exported = self.export(file, batch_size)
+            except OSError as e:
+                raise CommandError(f'Error exporting recipes: {e}.')
+            summary = self.stdout
+
+        summary.write(
+            f'Successfully exported {exported} recipes.',
+            style_func=self.style.SUCCESS
+        )
+
+    def export(self, file, batch_size):
+        """
+        Write recipes batch by batch of primary keys.
+
+        Tags and ingredients are small catalogs and are kept in memory,
+        relations of each batch are fetched with one query per table.
+        """
+        tag_slugs = dict(Tag.objects.values_list('pk', 'slug'))
+        ingredients = {
+            pk: (name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        }
+
+        exported = 0
+        last_pk = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(pk__gt=last_pk).order_by('pk').values(
+                    'pk', 'name', 'text', 'cooking_time', 'pub_date',
+                    'image', 'author_id'
+                )[:batch_size]
+            )
+            if not recipes:
+                return exported
+
+            recipe_ids = [recipe['pk'] for recipe in recipes]
+            author_emails = dict(
+                User.objects.filter(
+                    pk__in={recipe['author_id'] for recipe in recipes}
+                ).values_list('pk', 'email')
+            )
+            recipe_tags = defaultdict(list)
+            for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+                recipe_id__in=recipe_ids
+            ).order_by('pk').values_list('recipe_id', 'tag_id'):
+                recipe_tags[recipe_id].append(tag_slugs[tag_id])
+            recipe_ingredients = defaultdict(list)
+            for recipe_id, ingredient_id, amount in (
+                IngredientRecipe.objects.filter(
+                    recipe_id__in=recipe_ids
+                ).order_by('pk').values_list(
+                    'recipe_id', 'ingredient_id', 'amount'
+                )
+            ):
+                name, measurement_unit = ingredients[ingredient_id]
+                recipe_ingredients[recipe_id].append({
+                    IngredientFields.NAME.value: name,
+                    IngredientFields.MEASUREMENT_UNIT.value: measurement_unit,
+                    IngredientFields.AMOUNT.value: amount,
+                })
+
+            for recipe in recipes:
+                record = {
+                    RecipeFields.NAME.value: recipe['name'],
+                    RecipeFields.TEXT.value: recipe['text'],
+                    RecipeFields.COOKING_TIME.value: recipe['cooking_time'],
+                    RecipeFields.PUB_DATE.value: (
+                        recipe['pub_date'].isoformat()
+                    ),
+                    RecipeFields.IMAGE.value: recipe['image'],
+                    RecipeFields.AUTHOR.value: author_emails.get(
+                        recipe['author_id']
+                    ),
+                    RecipeFields.TAGS.value: recipe_tags[recipe['pk']],
+                    RecipeFields.INGREDIENTS.value: (
+                        recipe_ingredients[recipe['pk']]
+                    ),
+                }
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            exported += len(recipes)
+            last_pk = recipe_ids[-1]
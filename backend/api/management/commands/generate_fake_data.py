@@ -0,0 +1,220 @@
+import io
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from common.utils import bulk_create_with_ids
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, Tag)
+from users.models import FollowUser
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PASSWORD = 'fake-password'
+PLACEHOLDER_IMAGE_SIZE = (480, 480)
+TAGS_PER_RECIPE = (1, 3)
+INGREDIENTS_PER_RECIPE = (3, 10)
+AMOUNT_RANGE = (1, 500)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset (users, recipes, '
+        'subscriptions, favorites and shopping carts) for benchmarks. '
+        'Tags and ingredients must be loaded with `import_json` first, '
+        'every fake recipe gets its own copy of a placeholder image.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Number of users to create.'
+        )
+        parser.add_argument(
+            '--recipes-per-user', type=int, default=10,
+            help='Number of recipes authored by each user.'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Number of authors each user is subscribed to.'
+        )
+        parser.add_argument(
+            '--cart-size', type=int, default=5,
+            help='Number of recipes in each shopping cart.'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=5,
+            help='Number of favorite recipes of each user.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, the same seed builds the same graph.'
+        )
+        parser.add_argument(
+            '--prefix', default='fake',
+            help='Prefix of generated usernames and emails.'
+        )
+        parser.add_argument(
+            '--password', default=DEFAULT_PASSWORD,
+            help='Password of all generated users.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Number of rows written with one statement.'
+        )
+
+    def handle(self, *args, **options):
+        for option in ('users', 'recipes_per_user', 'follows',
+                       'cart_size', 'favorites'):
+            if options[option] < 0:
+                raise CommandError(
+                    f'--{option.replace("_", "-")} must not be negative.'
+                )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Users with prefix "{prefix}" already exist, '
+                'use another --prefix.'
+            )
+        tag_ids = sorted(Tag.objects.values_list('pk', flat=True))
+        ingredient_ids = sorted(
+            Ingredient.objects.values_list('pk', flat=True)
+        )
+        if not tag_ids or not ingredient_ids:
+            raise CommandError(
+                'No tags or ingredients found, run `import_json` first.'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            recipe_ids = self.create_recipes(
+                user_ids, tag_ids, ingredient_ids, options
+            )
+            self.create_follows(user_ids, options['follows'])
+            self.create_user_recipes(
+                FavoriteRecipe, user_ids, recipe_ids, options['favorites']
+            )
+            self.create_user_recipes(
+                ShoppingCart, user_ids, recipe_ids, options['cart_size']
+            )
+
+        # Relations were written without signals, rebuild derived data.
+        call_command('recount', batch_size=self.batch_size)
+        call_command('rebuild_shopping_lists')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully generated {len(user_ids)} users and '
+                f'{len(recipe_ids)} recipes.'
+            )
+        )
+
+    def sample(self, population, size):
+        return self.rng.sample(population, min(size, len(population)))
+
+    def create_users(self, options):
+        # Hashing is slow by design, all users share one hash.
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        users = [
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name='Fake',
+                last_name=f'User {number}',
+                password=password,
+            )
+            for number in range(options['users'])
+        ]
+        bulk_create_with_ids(User, users, batch_size=self.batch_size)
+        return [user.pk for user in users]
+
+    def get_placeholder_image(self):
+        buffer = io.BytesIO()
+        Image.new(
+            'RGB', PLACEHOLDER_IMAGE_SIZE, (230, 180, 120)
+        ).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def create_recipes(self, user_ids, tag_ids, ingredient_ids, options):
+        # Image files are deleted along with their recipe (see
+        # `recipes.signals`), so recipes must not share one file.
+        # `bulk_create` saves each `ContentFile` to the storage.
+        image = self.get_placeholder_image()
+        prefix = options['prefix']
+        recipes = [
+            Recipe(
+                name=f'Recipe {author_id}-{number}',
+                text=f'Synthetic recipe {number} of user {author_id}.',
+                image=ContentFile(
+                    image, name=f'{prefix}_{author_id}_{number}.png'
+                ),
+                author_id=author_id,
+                cooking_time=self.rng.randint(1, 180),
+            )
+            for author_id in user_ids
+            for number in range(options['recipes_per_user'])
+        ]
+        bulk_create_with_ids(Recipe, recipes, batch_size=self.batch_size)
+
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.sample(
+                    tag_ids, self.rng.randint(*TAGS_PER_RECIPE)
+                )
+            ),
+            batch_size=self.batch_size
+        )
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=self.rng.randint(*AMOUNT_RANGE)
+                )
+                for recipe in recipes
+                for ingredient_id in self.sample(
+                    ingredient_ids, self.rng.randint(*INGREDIENTS_PER_RECIPE)
+                )
+            ),
+            batch_size=self.batch_size
+        )
+        return [recipe.pk for recipe in recipes]
+
+    def create_follows(self, user_ids, follows):
+        FollowUser.objects.bulk_create(
+            (
+                FollowUser(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in [
+                    author_id
+                    for author_id in self.sample(user_ids, follows + 1)
+                    if author_id != user_id
+                ][:follows]
+            ),
+            batch_size=self.batch_size
+        )
+
+    def create_user_recipes(self, model, user_ids, recipe_ids, size):
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in self.sample(recipe_ids, size)
+            ),
+            batch_size=self.batch_size
+        )
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from common.images import generate_image_variants
+from recipes.models import Recipe
+
+User = get_user_model()
+
+IMAGE_FIELDS = (
+    (Recipe, 'image', 'image_variants'),
+    (User, 'avatar', 'avatar_variants'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate resized WebP/JPEG variants of recipe images and avatars '
+        'that do not have them yet (e.g. uploaded through admin).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants of all images.'
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field_name in IMAGE_FIELDS:
+            queryset = model.objects.exclude(
+                **{f'{field_name}__in': ('', None)}
+            )
+            if not options['force']:
+                queryset = queryset.filter(
+                    **{f'{variants_field_name}__isnull': True}
+                )
+
+            processed = 0
+            failed = 0
+            for pk in queryset.values_list('pk', flat=True).iterator():
+                try:
+                    generate_image_variants(
+                        model, pk, field_name, variants_field_name
+                    )
+                    processed += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(
+                        f'Failed to process {model.__name__} {pk}: {e}'
+                    )
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Generated image variants for {processed} '
+                    f'{model._meta.verbose_name_plural}, failed: {failed}.'
+                )
+            )
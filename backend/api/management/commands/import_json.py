@@ -1,101 +1,205 @@
-import json
+import csv
+import io
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from common.enums import FileNames, IngredientFields, TagFields
+from api.management.json_stream import (StreamFormats, iter_batches,
+                                        iter_json_items)
+from api.utils import bump_catalog_version
+from common.enums import CatalogNames, FileNames, IngredientFields, TagFields
 from recipes.models import Ingredient, Tag
 
+DEFAULT_BATCH_SIZE = 1000
+
 
 class Command(BaseCommand):
-    help = 'Import data from a JSON file into the Ingredient/Tag model.'
+    help = (
+        'Import data from a JSON file into the Ingredient/Tag model. '
+        'JSON arrays and NDJSON are read as a stream and upserted in '
+        'batches, so files of any size are loaded in constant memory.'
+    )
+
+    def add_arguments(self, parser):
+        data_dir = settings.BASE_DIR / 'data'
+        parser.add_argument(
+            '--ingredients',
+            default=str(data_dir / FileNames.INGREDIENTS.value),
+            help='Path to ingredients file, empty string to skip.'
+        )
+        parser.add_argument(
+            '--tags',
+            default=str(data_dir / FileNames.TAGS.value),
+            help='Path to tags file, empty string to skip.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=StreamFormats.CHOICES,
+            default=StreamFormats.AUTO,
+            help='Input format, detected by file suffix/content by default.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of records written with one statement.'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Load ingredients with PostgreSQL COPY (PostgreSQL only).'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy is supported by PostgreSQL only.')
 
-    def handle(self, *args, **kwargs):
         try:
-            json_file_path = settings.BASE_DIR / 'data'
-            self.import_ingredients(
-                json_file_path, FileNames.INGREDIENTS.value
-            )
-            self.import_tags(
-                json_file_path, FileNames.TAGS.value
-            )
+            if options['ingredients']:
+                self.import_ingredients(options['ingredients'], options)
+            if options['tags']:
+                self.import_tags(options['tags'], options)
+        except CommandError:
+            raise
         except Exception as e:
             raise CommandError(f'Error importing data: {e}.')
 
-    def import_ingredients(self, json_file_path, file_name):
-        try:
-            with open(
-                json_file_path / file_name, 'r', encoding='utf-8'
-            ) as file:
-                ingredients_data = json.load(file)
-
-            ingredients_to_add = []
-            for ingredient in ingredients_data:
-                name = ingredient.get(
-                    IngredientFields.NAME.value
-                )
-                measurement_unit = ingredient.get(
-                    IngredientFields.MEASUREMENT_UNIT.value
-                )
+    def read_records(self, file_path, options):
+        """Yield records of the file one by one."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield from iter_json_items(file, file_path, options['format'])
 
-                if name and measurement_unit:
-                    ingredients_to_add.append(
-                        Ingredient(
-                            name=name,
-                            measurement_unit=measurement_unit
-                        )
-                    )
-
-            Ingredient.objects.bulk_create(
-                ingredients_to_add,
-                ignore_conflicts=True
+    def report(self, object_name, inserted, updated, skipped):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully loaded {object_name}: inserted {inserted}, '
+                f'updated {updated}, skipped {skipped}.'
             )
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully loaded {len(ingredients_to_add)} '
-                    'ingredients.'
+        )
+
+    def get_ingredient_rows(self, file_path, options):
+        """Yield `(name, measurement_unit)`, `None` for invalid records."""
+        for ingredient in self.read_records(file_path, options):
+            name = measurement_unit = None
+            if isinstance(ingredient, dict):
+                name = ingredient.get(IngredientFields.NAME.value)
+                measurement_unit = ingredient.get(
+                    IngredientFields.MEASUREMENT_UNIT.value
                 )
+            if name and measurement_unit:
+                yield name, measurement_unit
+            else:
+                yield None
+
+    def import_ingredients(self, file_path, options):
+        """
+        Insert ingredients missing in the database.
+
+        Ingredient consists only of its unique `(name, measurement_unit)`
+        key, so existing ones are counted as skipped, never updated.
+        """
+        rows = self.get_ingredient_rows(file_path, options)
+        if options['copy']:
+            inserted, skipped = self.copy_ingredients(rows, options)
+        else:
+            inserted = skipped = 0
+            for batch in iter_batches(rows, options['batch_size']):
+                batch_inserted = self.upsert_ingredients(batch)
+                inserted += batch_inserted
+                skipped += len(batch) - batch_inserted
+
+        bump_catalog_version(CatalogNames.INGREDIENTS.value)
+        self.report('ingredients', inserted, 0, skipped)
+
+    @transaction.atomic
+    def upsert_ingredients(self, batch):
+        keys = {row for row in batch if row is not None}
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in keys}
+            ).values_list('name', 'measurement_unit')
+        )
+        new_ingredients = [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in keys - existing
+        ]
+        Ingredient.objects.bulk_create(new_ingredients, ignore_conflicts=True)
+        return len(new_ingredients)
+
+    def copy_ingredients(self, rows, options):
+        """
+        Load ingredients with `COPY` into a temporary table and move them
+        with `INSERT ... ON CONFLICT DO NOTHING`.
+        """
+        table = Ingredient._meta.db_table
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_ingredient '
+                '(name text, measurement_unit text) ON COMMIT DROP'
             )
-
-        except Exception as e:
-            raise CommandError(f'Error importing data: {e}')
-
-    def import_tags(self, json_file_path, file_name):
-
-        try:
-            with open(
-                json_file_path / file_name, 'r', encoding='utf-8'
-            ) as file:
-                tags_data = json.load(file)
-
-            tags_to_add = []
-            for tag in tags_data:
-                name = tag.get(
-                    TagFields.NAME.value
+            for batch in iter_batches(rows, options['batch_size']):
+                total += len(batch)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    row for row in batch if row is not None
                 )
-                slug = tag.get(
-                    TagFields.SLUG.value
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY import_ingredient (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
                 )
-
-                if name and slug:
-                    tags_to_add.append(
-                        Tag(
-                            name=name,
-                            slug=slug
-                        )
-                    )
-
-            Tag.objects.bulk_create(
-                tags_to_add,
-                ignore_conflicts=True
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM import_ingredient '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
             )
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully loaded {len(tags_to_add)} tags'
-                )
-            )
-
-        except Exception as e:
-            raise CommandError(f'Error importing data: {e}')
+            inserted = cursor.rowcount
+        return inserted, total - inserted
+
+    def import_tags(self, file_path, options):
+        """Upsert tags by slug, names of existing tags are updated."""
+        inserted = updated = skipped = 0
+        records = self.read_records(file_path, options)
+        for batch in iter_batches(records, options['batch_size']):
+            batch_inserted, batch_updated = self.upsert_tags(batch)
+            inserted += batch_inserted
+            updated += batch_updated
+            skipped += len(batch) - batch_inserted - batch_updated
+
+        bump_catalog_version(CatalogNames.TAGS.value)
+        self.report('tags', inserted, updated, skipped)
+
+    @transaction.atomic
+    def upsert_tags(self, batch):
+        names_by_slug = {}
+        for tag in batch:
+            if not isinstance(tag, dict):
+                continue
+            name = tag.get(TagFields.NAME.value)
+            slug = tag.get(TagFields.SLUG.value)
+            if name and slug:
+                names_by_slug[slug] = name
+
+        existing = Tag.objects.select_for_update().in_bulk(
+            names_by_slug, field_name='slug'
+        )
+        tags_to_update = []
+        for slug, tag in existing.items():
+            if tag.name != names_by_slug[slug]:
+                tag.name = names_by_slug[slug]
+                tags_to_update.append(tag)
+        tags_to_create = [
+            Tag(name=name, slug=slug)
+            for slug, name in names_by_slug.items()
+            if slug not in existing
+        ]
+
+        Tag.objects.bulk_update(tags_to_update, ('name',))
+        Tag.objects.bulk_create(tags_to_create, ignore_conflicts=True)
+        return len(tags_to_create), len(tags_to_update)
@@ -0,0 +1,221 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+
+from api.cache import (RECIPES_GENERATION, author_recipes_generation,
+                       bump_generations, get_generation_key, tag_generation)
+from api.management.json_stream import (StreamFormats, iter_batches,
+                                        iter_json_items)
+from common.constants import MIN_VALUE
+from common.enums import IngredientFields, RecipeFields
+from common.utils import bulk_create_with_ids
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Import recipes exported by `export_recipes`. Authors, tags and '
+        'ingredients must already exist, recipes referencing unknown '
+        'ones are skipped. Recipes already stored with the same author, '
+        'name and publication date are skipped too, so the import can be '
+        're-run with the same file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to NDJSON or JSON file.')
+        parser.add_argument(
+            '--format',
+            choices=StreamFormats.CHOICES,
+            default=StreamFormats.AUTO,
+            help='Input format, detected by file suffix/content by default.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of recipes written with one statement.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        self.load_id_maps()
+        imported = skipped = 0
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as file:
+                records = iter_json_items(
+                    file, options['path'], options['format']
+                )
+                for batch in iter_batches(records, options['batch_size']):
+                    batch_imported = self.import_batch(batch)
+                    imported += batch_imported
+                    skipped += len(batch) - batch_imported
+        except Exception as e:
+            raise CommandError(
+                f'Error importing recipes after {imported} recipes: {e}.'
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully imported {imported} recipes, '
+                f'skipped {skipped}.'
+            )
+        )
+
+    def load_id_maps(self):
+        """Keep natural key to id maps in memory for the whole import."""
+        self.author_ids = dict(User.objects.values_list('email', 'pk'))
+        self.tag_ids = dict(Tag.objects.values_list('slug', 'pk'))
+        self.ingredient_ids = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        }
+
+    def build_recipe(self, record):
+        """
+        Return `(recipe, tag_ids, amounts)` or `None` for invalid record.
+        """
+        if not isinstance(record, dict):
+            return None
+        author_id = self.author_ids.get(record.get(RecipeFields.AUTHOR.value))
+        name = record.get(RecipeFields.NAME.value)
+        text = record.get(RecipeFields.TEXT.value)
+        image = record.get(RecipeFields.IMAGE.value)
+        if author_id is None or not (name and text and image):
+            return None
+
+        try:
+            tag_ids = {
+                self.tag_ids[slug]
+                for slug in record.get(RecipeFields.TAGS.value, ())
+            }
+            amounts = {}
+            for ingredient in record.get(RecipeFields.INGREDIENTS.value, ()):
+                ingredient_id = self.ingredient_ids[(
+                    ingredient[IngredientFields.NAME.value],
+                    ingredient[IngredientFields.MEASUREMENT_UNIT.value],
+                )]
+                amounts[ingredient_id] = int(
+                    ingredient[IngredientFields.AMOUNT.value]
+                )
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not tag_ids or not amounts:
+            return None
+
+        recipe = Recipe(
+            name=name,
+            text=text,
+            image=image,
+            author_id=author_id,
+            cooking_time=(
+                record.get(RecipeFields.COOKING_TIME.value) or MIN_VALUE
+            ),
+        )
+        recipe.imported_pub_date = parse_datetime(
+            record.get(RecipeFields.PUB_DATE.value) or ''
+        )
+        return recipe, tag_ids, amounts
+
+    def exclude_existing(self, rows):
+        """
+        Drop recipes already stored or repeated earlier in the batch.
+
+        Recipes are matched by author, name and publication date, records
+        without the date by author and name only.
+        """
+        seen = set()
+        for author_id, name, pub_date in Recipe.objects.filter(
+            author_id__in={recipe.author_id for recipe, _, _ in rows},
+            name__in={recipe.name for recipe, _, _ in rows},
+        ).values_list('author_id', 'name', 'pub_date'):
+            seen.update(((author_id, name, pub_date), (author_id, name, None)))
+
+        new_rows = []
+        for row in rows:
+            recipe = row[0]
+            key = (recipe.author_id, recipe.name, recipe.imported_pub_date)
+            if key in seen:
+                continue
+            seen.update((key, (recipe.author_id, recipe.name, None)))
+            new_rows.append(row)
+        return new_rows
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        rows = [row for row in map(self.build_recipe, batch) if row]
+        if rows:
+            rows = self.exclude_existing(rows)
+        if not rows:
+            return 0
+        recipes = [recipe for recipe, _, _ in rows]
+
+        bulk_create_with_ids(Recipe, recipes)
+
+        # `auto_now_add` overrides `pub_date` on insert, restore it.
+        dated_recipes = []
+        for recipe in recipes:
+            if recipe.imported_pub_date:
+                recipe.pub_date = recipe.imported_pub_date
+                dated_recipes.append(recipe)
+        Recipe.objects.bulk_update(dated_recipes, ('pub_date',))
+
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, tag_ids, _ in rows
+            for tag_id in tag_ids
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe_id=recipe.pk, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, _, amounts in rows
+            for ingredient_id, amount in amounts.items()
+        )
+        self.increment_recipes_counts(recipes)
+        self.invalidate_cached_lists(rows)
+        return len(recipes)
+
+    def invalidate_cached_lists(self, rows):
+        """
+        `bulk_create` sends no signals, bump generations of the lists the
+        new recipes appear in, as `api.signals` does for a saved recipe.
+        """
+        bump_generations({
+            get_generation_key(RECIPES_GENERATION),
+            *(
+                author_recipes_generation(recipe.author_id)
+                for recipe, _, _ in rows
+            ),
+            *(
+                tag_generation(tag_id)
+                for _, tag_ids, _ in rows
+                for tag_id in tag_ids
+            ),
+        })
+
+    def increment_recipes_counts(self, recipes):
+        """
+        `bulk_create` sends no signals, update `User.recipes_count` with
+        one statement per distinct number of new recipes.
+        """
+        authors_by_delta = defaultdict(list)
+        for author_id, delta in Counter(
+            recipe.author_id for recipe in recipes
+        ).items():
+            authors_by_delta[delta].append(author_id)
+        for delta, author_ids in authors_by_delta.items():
+            User.objects.filter(pk__in=author_ids).update(
+                recipes_count=F('recipes_count') + delta
+            )
@@ -0,0 +1,122 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.generate_fake_data import DEFAULT_PASSWORD
+from api.management.load_scenarios import SCENARIOS, LoadTestRunner
+
+RESULT_HEADER = (
+    f'{"endpoint":<45} {"requests":>8} {"errors":>6} {"p50 ms":>8} '
+    f'{"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}'
+)
+COMPARISON_HEADER = (
+    f'{"endpoint":<45} {"base req/s":>10} {"compare req/s":>13} {"ratio":>6}'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run read-only HTTP load test scenarios against a running server '
+        'and report p50/p95/p99 latency and throughput per endpoint. '
+        'Use `generate_fake_data` to fill the database first. '
+        'With `--compare-base-url` the same scenarios run against a second '
+        'server, e.g. WSGI and ASGI deployments, and throughputs are compared.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://localhost:8000',
+            help='Server to test.'
+        )
+        parser.add_argument(
+            '--compare-base-url',
+            help='Second server with the same database to compare with.'
+        )
+        parser.add_argument(
+            '--email', default='fake_0@example.com',
+            help='Email of the user authenticated scenarios run as.'
+        )
+        parser.add_argument(
+            '--password', default=DEFAULT_PASSWORD,
+            help='Password of the user.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of measured requests per scenario.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Number of unmeasured requests per scenario.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=10,
+            help='Number of parallel clients.'
+        )
+        parser.add_argument(
+            '--scenario', action='append', default=[],
+            help='Run only scenarios containing this text, repeatable.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed of the chosen path parameters.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError(
+                '--requests and --concurrency must be positive integers.'
+            )
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['scenario'] or any(
+                text in scenario.name for text in options['scenario']
+            )
+        ]
+        if not scenarios:
+            raise CommandError('No scenarios match the --scenario filter.')
+
+        base_urls = [options['base_url']]
+        if options['compare_base_url']:
+            base_urls.append(options['compare_base_url'])
+        throughputs = {}
+        for base_url in base_urls:
+            if len(base_urls) > 1:
+                self.stdout.write(self.style.MIGRATE_HEADING(base_url))
+            for result in self.run_scenarios(base_url, scenarios, options):
+                throughputs.setdefault(result.name, []).append(
+                    result.throughput
+                )
+        if len(base_urls) > 1:
+            self.stdout.write(self.style.MIGRATE_HEADING('Comparison'))
+            self.stdout.write(COMPARISON_HEADER)
+            for name, (base, compare) in throughputs.items():
+                ratio = compare / base if base else 0.0
+                self.stdout.write(
+                    f'{name:<45} {base:>10.1f} {compare:>13.1f} {ratio:>6.2f}'
+                )
+
+    def run_scenarios(self, base_url, scenarios, options):
+        """Print and return results of the scenarios run on the server."""
+        results = []
+        try:
+            token = LoadTestRunner.login(
+                base_url, options['email'], options['password']
+            )
+            runner = LoadTestRunner(
+                base_url,
+                token=token,
+                concurrency=options['concurrency'],
+                seed=options['seed']
+            )
+            self.stdout.write(RESULT_HEADER)
+            for result in runner.run(
+                scenarios, options['requests'], options['warmup']
+            ):
+                self.stdout.write(
+                    f'{result.name:<45} {result.requests:>8} '
+                    f'{result.errors:>6} {result.p50:>8.1f} '
+                    f'{result.p95:>8.1f} {result.p99:>8.1f} '
+                    f'{result.throughput:>8.1f}'
+                )
+                results.append(result)
+        except Exception as e:
+            raise CommandError(f'Load test of {base_url} failed: {e}.')
+        return results
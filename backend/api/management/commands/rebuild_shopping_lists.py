@@ -0,0 +1,127 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import ShoppingCart, ShoppingListItem
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild materialized shopping lists from shopping carts '
+        'or verify that they are in sync.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report users with out of sync shopping lists.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of users processed in one transaction.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        user_ids = sorted(
+            set(
+                ShoppingCart.objects.order_by().values_list(
+                    'user_id', flat=True
+                ).distinct()
+            ) | set(
+                ShoppingListItem.objects.order_by().values_list(
+                    'user_id', flat=True
+                ).distinct()
+            )
+        )
+
+        out_of_sync = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            if options['verify']:
+                out_of_sync += len(self.verify_batch(batch))
+            else:
+                self.rebuild_batch(batch)
+
+        if options['verify']:
+            if out_of_sync:
+                raise CommandError(
+                    f'{out_of_sync} of {len(user_ids)} shopping lists '
+                    'are out of sync.'
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'All {len(user_ids)} shopping lists are in sync.'
+                )
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt {len(user_ids)} shopping lists.'
+            )
+        )
+
+    def get_expected_items(self, user_ids):
+        """Return `{(user_id, ingredient_id): amount}` from carts."""
+        totals = ShoppingCart.objects.filter(
+            user_id__in=user_ids,
+            recipe__ingredient_recipe__isnull=False
+        ).order_by().values(
+            'user_id',
+            ingredient_id=F('recipe__ingredient_recipe__ingredient_id')
+        ).annotate(
+            amount=Sum('recipe__ingredient_recipe__amount')
+        )
+        return {
+            (item['user_id'], item['ingredient_id']): item['amount']
+            for item in totals
+        }
+
+    def get_actual_items(self, user_ids):
+        """Return `{(user_id, ingredient_id): amount}` from the table."""
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'ingredient_id', 'amount')
+        }
+
+    def verify_batch(self, user_ids):
+        expected = self.get_expected_items(user_ids)
+        actual = self.get_actual_items(user_ids)
+        out_of_sync = {
+            user_id
+            for user_id, ingredient_id in expected.keys() | actual.keys()
+            if expected.get((user_id, ingredient_id))
+            != actual.get((user_id, ingredient_id))
+        }
+        for user_id in sorted(out_of_sync):
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Shopping list of user {user_id} is out of sync.'
+                )
+            )
+        return out_of_sync
+
+    @transaction.atomic
+    def rebuild_batch(self, user_ids):
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for (user_id, ingredient_id), amount
+            in self.get_expected_items(user_ids).items()
+        )
@@ -0,0 +1,112 @@
+import operator
+from functools import reduce
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import FollowUser
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def count_subquery(model, field):
+    """Return `COUNT(*)` of `model` rows referencing the outer row."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalculate denormalized counters of recipes (favorites, carts) '
+        'and users (recipes, followers) in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of rows updated with one statement.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer.')
+
+        recipes_fixed = self.recount(
+            Recipe,
+            {
+                'favorites_count': count_subquery(FavoriteRecipe, 'recipe'),
+                'shopping_cart_count': count_subquery(ShoppingCart, 'recipe'),
+            },
+            batch_size
+        )
+        users_fixed = self.recount(
+            User,
+            {
+                'recipes_count': count_subquery(Recipe, 'author'),
+                'followers_count': count_subquery(FollowUser, 'author'),
+            },
+            batch_size
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully recounted counters: fixed {recipes_fixed} '
+                f'recipes and {users_fixed} users.'
+            )
+        )
+
+    def recount(self, model, counters, batch_size):
+        """
+        Update drifted counters of `model` batch by batch of primary keys.
+
+        Returns number of rows which had wrong counters.
+        """
+        fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return fixed
+
+            with transaction.atomic():
+                drifted_pks = list(
+                    model.objects.filter(pk__in=pks).annotate(
+                        **{
+                            f'actual_{field}': expression
+                            for field, expression in counters.items()
+                        }
+                    ).filter(
+                        reduce(operator.or_, (
+                            ~Q(**{field: F(f'actual_{field}')})
+                            for field in counters
+                        ))
+                    ).values_list('pk', flat=True)
+                )
+                if drifted_pks:
+                    model.objects.filter(
+                        pk__in=drifted_pks
+                    ).update(**counters)
+
+            fixed += len(drifted_pks)
+            last_pk = pks[-1]
@@ -0,0 +1,128 @@
+import json
+import re
+from itertools import islice
+from pathlib import Path
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+CHUNK_SIZE = 64 * 1024
+# Characters that may continue a number decoded from a cut buffer.
+NUMBER_TAIL_RE = re.compile(r'[0-9.eE+-]*')
+
+
+class StreamFormats:
+    AUTO = 'auto'
+    JSON = 'json'
+    NDJSON = 'ndjson'
+
+    CHOICES = (AUTO, JSON, NDJSON)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """
+    Yield items of a top level JSON array reading the file by chunks.
+
+    Only one chunk and one item are held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def read_more():
+        nonlocal buffer, eof
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+    while not buffer.lstrip() and not eof:
+        read_more()
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('JSON file must contain an array.')
+    buffer = buffer[1:]
+    expect_value = True
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise ValueError('Unexpected end of JSON array.')
+            read_more()
+            continue
+
+        if buffer[0] == ']':
+            return
+        if not expect_value:
+            if buffer[0] != ',':
+                raise ValueError(f'Expected "," in JSON array: {buffer[:20]}')
+            buffer = buffer[1:]
+            expect_value = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        if not eof and (
+            end == len(buffer)
+            or is_number(item) and NUMBER_TAIL_RE.fullmatch(buffer, end)
+        ):
+            # Value may be cut at the chunk border: `1.` of `1.5e10` is
+            # decoded as `1` and the rest is left in the buffer.
+            read_more()
+            continue
+
+        yield item
+        buffer = buffer[end:]
+        expect_value = False
+
+
+def iter_ndjson(file):
+    """Yield items of newline delimited JSON, one per non-empty line."""
+    for line_number, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Invalid JSON on line {line_number}: {e}')
+
+
+def detect_format(file, path):
+    """Guess format by file suffix or by the first non-blank character."""
+    if Path(path).suffix.lower() in NDJSON_SUFFIXES:
+        return StreamFormats.NDJSON
+    position = file.tell()
+    while True:
+        char = file.read(1)
+        if not char or not char.isspace():
+            break
+    file.seek(position)
+    return StreamFormats.JSON if char == '[' else StreamFormats.NDJSON
+
+
+def iter_json_items(file, path, stream_format=StreamFormats.AUTO):
+    """Yield items of JSON array or NDJSON file."""
+    if stream_format == StreamFormats.AUTO:
+        stream_format = detect_format(file, path)
+    if stream_format == StreamFormats.JSON:
+        return iter_json_array(file)
+    return iter_ndjson(file)
+
+
+def iter_batches(items, batch_size):
+    """Split iterable into lists of at most `batch_size` items."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
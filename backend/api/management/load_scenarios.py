@@ -0,0 +1,203 @@
+"""
+Read-only HTTP load test scenarios for endpoints of
+`docs/openapi-schema.yml`.
+
+Each scenario is named after the schema path it exercises, path
+parameters are filled with ids discovered from the running server.
+"""
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+Scenario = namedtuple('Scenario', ('name', 'path', 'params', 'auth'))
+ScenarioResult = namedtuple(
+    'ScenarioResult',
+    ('name', 'requests', 'errors', 'p50', 'p95', 'p99', 'throughput')
+)
+
+SCENARIOS = (
+    Scenario('GET /api/recipes/', '/api/recipes/', {}, False),
+    Scenario('GET /api/recipes/ (auth)', '/api/recipes/', {}, True),
+    Scenario(
+        'GET /api/recipes/?tags', '/api/recipes/',
+        {'tags': '{tag_slug}'}, False
+    ),
+    Scenario(
+        'GET /api/recipes/?author', '/api/recipes/',
+        {'author': '{user_id}'}, True
+    ),
+    Scenario(
+        'GET /api/recipes/?is_favorited', '/api/recipes/',
+        {'is_favorited': 1}, True
+    ),
+    Scenario(
+        'GET /api/recipes/?is_in_shopping_cart', '/api/recipes/',
+        {'is_in_shopping_cart': 1}, True
+    ),
+    Scenario('GET /api/recipes/{id}/', '/api/recipes/{recipe_id}/', {}, True),
+    Scenario(
+        'GET /api/recipes/{id}/get-link/',
+        '/api/recipes/{recipe_id}/get-link/', {}, False
+    ),
+    Scenario(
+        'GET /api/recipes/download_shopping_cart/',
+        '/api/recipes/download_shopping_cart/', {}, True
+    ),
+    Scenario('GET /api/tags/', '/api/tags/', {}, False),
+    Scenario('GET /api/tags/{id}/', '/api/tags/{tag_id}/', {}, False),
+    Scenario(
+        'GET /api/ingredients/?name', '/api/ingredients/',
+        {'name': '{ingredient_prefix}'}, False
+    ),
+    Scenario(
+        'GET /api/ingredients/{id}/',
+        '/api/ingredients/{ingredient_id}/', {}, False
+    ),
+    Scenario('GET /api/users/', '/api/users/', {}, True),
+    Scenario('GET /api/users/{id}/', '/api/users/{user_id}/', {}, True),
+    Scenario('GET /api/users/me/', '/api/users/me/', {}, True),
+    Scenario(
+        'GET /api/users/subscriptions/', '/api/users/subscriptions/',
+        {'recipes_limit': 3}, True
+    ),
+)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadTestRunner:
+    """Run scenarios against `base_url` with a pool of threads."""
+
+    def __init__(self, base_url, token=None, concurrency=10, seed=0,
+                 timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.local = threading.local()
+        self.fixtures = {}
+
+    def get_session(self):
+        # `requests.Session` is not thread safe, one per worker thread.
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def get(self, path, params=None, auth=False):
+        headers = {}
+        if auth and self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        return self.get_session().get(
+            self.base_url + path,
+            params=params,
+            headers=headers,
+            timeout=self.timeout
+        )
+
+    def get_json(self, path, params=None, auth=False):
+        response = self.get(path, params, auth)
+        response.raise_for_status()
+        return response.json()
+
+    @classmethod
+    def login(cls, base_url, email, password, timeout=30):
+        response = requests.post(
+            base_url.rstrip('/') + '/api/auth/token/login/',
+            json={'email': email, 'password': password},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()['auth_token']
+
+    def discover_fixtures(self):
+        """Collect ids used to fill path and query parameters."""
+        recipes = self.get_json('/api/recipes/', {'limit': 100})['results']
+        users = self.get_json('/api/users/', {'limit': 100}, auth=True)
+        tags = self.get_json('/api/tags/')
+        ingredients = self.get_json('/api/ingredients/')
+        if not (recipes and tags and ingredients):
+            raise ValueError(
+                'Server has no recipes, tags or ingredients, '
+                'run `generate_fake_data` first.'
+            )
+        self.fixtures = {
+            'recipe_id': [recipe['id'] for recipe in recipes],
+            'user_id': [user['id'] for user in users['results']],
+            'tag_id': [tag['id'] for tag in tags],
+            'tag_slug': [tag['slug'] for tag in tags],
+            'ingredient_id': [
+                ingredient['id'] for ingredient in ingredients[:500]
+            ],
+            'ingredient_prefix': sorted({
+                ingredient['name'][:2] for ingredient in ingredients
+            }),
+        }
+
+    def fill(self, template):
+        if not isinstance(template, str):
+            return template
+        return template.format(**{
+            key: self.rng.choice(values)
+            for key, values in self.fixtures.items()
+            if values and f'{{{key}}}' in template
+        })
+
+    def build_requests(self, scenario, count):
+        # Parameters are drawn up front, so threads do not share the rng.
+        return [
+            (
+                self.fill(scenario.path),
+                {key: self.fill(value)
+                 for key, value in scenario.params.items()}
+            )
+            for _ in range(count)
+        ]
+
+    def timed_get(self, scenario, path, params):
+        start = time.perf_counter()
+        try:
+            response = self.get(path, params, scenario.auth)
+            # Read the whole body, streaming responses included.
+            response.content
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    def run_scenario(self, scenario, count):
+        planned = self.build_requests(scenario, count)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(
+                lambda request: self.timed_get(scenario, *request), planned
+            ))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        return ScenarioResult(
+            name=scenario.name,
+            requests=count,
+            errors=sum(failed for _, failed in results),
+            p50=percentile(latencies, 50),
+            p95=percentile(latencies, 95),
+            p99=percentile(latencies, 99),
+            throughput=count / elapsed if elapsed else 0.0,
+        )
+
+    def run(self, scenarios, count, warmup=0):
+        self.discover_fixtures()
+        for scenario in scenarios:
+            if warmup:
+                self.run_scenario(scenario, warmup)
+            yield self.run_scenario(scenario, count)
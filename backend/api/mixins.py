@@ -1,8 +1,15 @@
+from django.utils.http import parse_etags
 from djoser import views as djoser_views
-from rest_framework import serializers, viewsets
+from rest_framework import serializers, status, viewsets
+from rest_framework.response import Response
 
 from recipes.models import FavoriteRecipe, ShoppingCart
 from users.models import FollowUser
+from .cache import (get_cached_response_data, get_generations,
+                    get_list_filter_dependencies, get_recipe_dependencies,
+                    get_response_cache_key, recipe_generation,
+                    set_cached_response_data)
+from .utils import get_catalog_etag
 
 
 class BaseRecipeViewSetMixin(viewsets.ModelViewSet):
@@ -16,6 +23,59 @@ class BaseRecipeViewSetMixin(viewsets.ModelViewSet):
         return ShoppingCart.objects.filter(user=user, recipe=recipe).exists()
 
 
+class AnonymousRecipeCacheMixin:
+    """
+    Cache list and detail responses of anonymous users.
+
+    Flags of anonymous users are always `False`, so responses depend only
+    on the query. A cached response is valid while generations of its
+    filter (author, tags or all recipes) and of every shown recipe, its
+    author and tags are unchanged, see `api.cache`.
+    """
+
+    def get_request_dependencies(self, request, **kwargs):
+        if self.action == 'list':
+            return get_list_filter_dependencies(request)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {recipe_generation(kwargs[lookup_url_kwarg])}
+
+    def get_cached_response(self, request, handler, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return handler(request, *args, **kwargs)
+
+        cache_key = get_response_cache_key(request, self.action)
+        data = get_cached_response_data(cache_key)
+        if data is not None:
+            return Response(data)
+
+        # Read before the query, a concurrent change bumps them later.
+        generations = get_generations(
+            self.get_request_dependencies(request, **kwargs)
+        )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            recipes = response.data
+            if self.action == 'list':
+                recipes = recipes.get('results', ())
+            else:
+                recipes = (recipes,)
+            generations.update(get_generations(set().union(
+                *map(get_recipe_dependencies, recipes)
+            )))
+            set_cached_response_data(cache_key, response.data, generations)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
 class BaseUserViewSetMixin(djoser_views.UserViewSet):
 
     def check_subscription(self, user, author):
@@ -26,19 +86,78 @@ class BaseUserViewSetMixin(djoser_views.UserViewSet):
 
 
 class TagIngredientViewSetMixin(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only catalog viewset answering conditional GET requests.
+
+    Responses carry a strong `ETag` built from the catalog version
+    (see `bump_catalog_version`) and the request URL, so a matching
+    `If-None-Match` gets `304 Not Modified` without touching the database.
+    """
 
     pagination_class = None
+    catalog_name = None
+    cache_control = 'public, no-cache'
+
+    def get_etag(self, request):
+        return get_catalog_etag(
+            self.catalog_name,
+            request.get_full_path(),
+            request.accepted_renderer.format
+        )
+
+    def get_conditional_response(self, request, handler, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+            response['Cache-Control'] = self.cache_control
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
 
 
 class SubscriptionMixin:
 
+    followed_authors_attr = '_followed_author_ids'
+
+    def get_followed_author_ids(self, request, user):
+        """
+        Return ids of authors the user follows, loaded once per request.
+
+        The set is stored on the request itself, so every serializer
+        rendering the same response (including nested ones) shares it.
+        """
+        followed_ids = getattr(request, self.followed_authors_attr, None)
+        if followed_ids is None:
+            followed_ids = set(
+                user.follower.values_list('author_id', flat=True)
+            )
+            setattr(request, self.followed_authors_attr, followed_ids)
+        return followed_ids
+
     def is_subscribed(self, user, author):
         request = self.context.get('request')
         if request is None or user.is_anonymous:
             return False
         if user == author:
             return False
-        return user.follower.filter(author=author).exists()
+        return author.pk in self.get_followed_author_ids(request, user)
 
     def is_valid_subscription(self, user, author):
         if user == author:
@@ -1,20 +1,51 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
 from common.constants import MAX_VALUE, MIN_VALUE
 from common.enums import (FollowUserFields, IngredientFields, ObjectNames,
-                          RecipeFields, UserFields)
-from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+                          RecipeAnnotationFields, RecipeFields, UserFields)
+from common.images import schedule_image_variants
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingListItem, Tag)
 from .mixins import SubscriptionMixin
-from .utils import bulk_create_ingredients
+from .utils import (bulk_create_ingredients, get_amount_deltas,
+                    update_recipe_ingredients, update_shopping_list)
 
 User = get_user_model()
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Represent names of resized image variants as absolute URLs.
+
+    `None` means variants are not generated yet, clients should use
+    the original image meanwhile.
+    """
+
+    def to_representation(self, variants):
+        if not variants:
+            return None
+        request = self.context.get('request')
+        build_url = (
+            request.build_absolute_uri if request else (lambda url: url)
+        )
+        return {
+            size_name: {
+                extension: build_url(default_storage.url(name))
+                for extension, name in formats.items()
+            }
+            for size_name, formats in variants.items()
+        }
+
+
 class UserSerializer(SubscriptionMixin, serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
@@ -25,6 +56,7 @@ class UserSerializer(SubscriptionMixin, serializers.ModelSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_variants',
             'is_subscribed'
         )
 
@@ -36,10 +68,17 @@ class UserSerializer(SubscriptionMixin, serializers.ModelSerializer):
 class AvatarSerializer(serializers.ModelSerializer):
 
     avatar = Base64ImageField(required=True)
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
-        fields = ('avatar',)
+        fields = ('avatar', 'avatar_variants')
+
+    def update(self, user, validated_data):
+        user.avatar_variants = None
+        user = super().update(user, validated_data)
+        schedule_image_variants(user, 'avatar', 'avatar_variants')
+        return user
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -54,15 +93,16 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 class FollowUserSerializer(SubscriptionMixin, serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = (
             'id', 'email', 'username', 'first_name',
             'last_name', 'is_subscribed', 'recipes',
-            'recipes_count', 'avatar'
+            'recipes_count', 'avatar', 'avatar_variants'
         )
 
     def get_is_subscribed(self, author):
@@ -86,9 +126,6 @@ class FollowUserSerializer(SubscriptionMixin, serializers.ModelSerializer):
             context=self.context
         ).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def validate(self, data):
         user = self.context['request'].user
         author = data.get(FollowUserFields.AUTHOR.value)
@@ -122,9 +159,43 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug',)
 
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    Many related field resolving all submitted primary keys at once.
+
+    Default `ManyRelatedField` runs one query per item, this one runs
+    a single `pk__in` query and keeps order of submitted keys.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for pk in data:
+            try:
+                pks.append(pk_field.to_python(pk))
+            except DjangoValidationError:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(pk).__name__
+                )
+
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
+    tags = BulkManyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all()
+        )
     )
     ingredients = IngredientInRecipeSerializer(many=True)
     cooking_time = serializers.IntegerField(
@@ -171,32 +242,34 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return tags
 
     def validate_ingredients(self, ingredients):
-        check_duplicates = set([
-            (
-                ingredient[IngredientFields.ID.value],
-                ingredient[IngredientFields.AMOUNT.value]
-            ) for ingredient in ingredients
-        ])
-        if len(check_duplicates) != len(ingredients):
+        ingredient_ids = [
+            ingredient[IngredientFields.ID.value]
+            for ingredient in ingredients
+        ]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
             raise serializers.ValidationError(
                 'You must not repeat the same ingredients.'
             )
 
-        for ingredient in ingredients:
-            if not Ingredient.objects.filter(
-                id=ingredient[IngredientFields.ID.value]
-            ).exists():
+        existing_ids = set(
+            Ingredient.objects.filter(
+                id__in=ingredient_ids
+            ).values_list('id', flat=True)
+        )
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in existing_ids:
                 raise serializers.ValidationError(
-                    f'Ingredient with {ingredient[IngredientFields.ID.value]} '
-                    'id does not exist.'
+                    f'Ingredient with {ingredient_id} id does not exist.'
                 )
 
         return ingredients
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop(ObjectNames.TAGS.value)
         ingredients = validated_data.pop(ObjectNames.INGREDIENTS.value)
         recipe = Recipe.objects.create(**validated_data)
+        schedule_image_variants(recipe, 'image', 'image_variants')
 
         recipe.tags.set(tags)
 
@@ -204,12 +277,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.get(ObjectNames.TAGS.value)
         ingredients = validated_data.get(ObjectNames.INGREDIENTS.value)
-        recipe.image = validated_data.get(
-            RecipeFields.IMAGE.value, recipe.image
-        )
+        image = validated_data.get(RecipeFields.IMAGE.value)
+        if image:
+            recipe.image = image
+            recipe.image_variants = None
         recipe.name = validated_data.get(
             RecipeFields.NAME.value, recipe.name
         )
@@ -221,14 +296,25 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
         if tags:
-            recipe.tags.clear()
             recipe.tags.set(tags)
 
         if ingredients:
-            recipe.ingredients.clear()
-            bulk_create_ingredients(recipe, ingredients)
+            old_amounts = update_recipe_ingredients(recipe, ingredients)
+            update_shopping_list(
+                recipe.in_shopping_cart_of.values_list('user_id', flat=True),
+                get_amount_deltas(
+                    old_amounts,
+                    {
+                        ingredient[IngredientFields.ID.value]:
+                            ingredient[IngredientFields.AMOUNT.value]
+                        for ingredient in ingredients
+                    }
+                )
+            )
 
         recipe.save()
+        if image:
+            schedule_image_variants(recipe, 'image', 'image_variants')
         return recipe
 
     def to_representation(self, recipe):
@@ -239,6 +325,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     ingredients = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     author = UserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -247,12 +334,23 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time', 'favorites_count'
         )
+        read_only_fields = ('favorites_count',)
 
     def get_ingredients(self, obj):
-        """Return ingredients with amount in the response."""
-        ingredients = obj.ingredient_recipe.select_related('ingredient')
+        """
+        Return ingredients with amount in the response.
+
+        Rows are taken from the `ingredient_recipe__ingredient` prefetch
+        cache when the queryset provides it.
+        """
+        prefetched = getattr(obj, '_prefetched_objects_cache', {})
+        if 'ingredient_recipe' in prefetched:
+            ingredients = obj.ingredient_recipe.all()
+        else:
+            ingredients = obj.ingredient_recipe.select_related('ingredient')
         return [
             {
                 IngredientFields.ID.value: ingredient.ingredient.id,
@@ -270,12 +368,26 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         return TagSerializer(tags, many=True).data
 
     def get_is_favorited(self, recipe):
+        """Prefer the queryset annotation, query only if it is missing."""
+        annotated = getattr(
+            recipe, RecipeAnnotationFields.IS_FAVORITED.value, None
+        )
+        if annotated is not None:
+            return annotated
+
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
             return request.user.favorites.filter(recipe=recipe).exists()
         return False
 
     def get_is_in_shopping_cart(self, recipe):
+        """Prefer the queryset annotation, query only if it is missing."""
+        annotated = getattr(
+            recipe, RecipeAnnotationFields.IS_IN_SHOPPING_CART.value, None
+        )
+        if annotated is not None:
+            return annotated
+
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
             return request.user.shopping_cart.filter(recipe=recipe).exists()
@@ -283,6 +395,20 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
 
 
 class ShortenedRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
@@ -0,0 +1,116 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from common.enums import CatalogNames
+from common.images import image_variants_saved
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from users.models import User
+from .authentication import token_cache
+from .autocomplete import ingredient_index
+from .cache import (RECIPES_GENERATION, author_generation,
+                    author_recipes_generation, bump_generations,
+                    get_generation_key, recipe_generation, tag_generation)
+from .utils import bump_catalog_version
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalog(sender, instance, **kwargs):
+    """Rebuild autocomplete index and bump ingredients catalog version."""
+    ingredient_index.invalidate()
+    bump_catalog_version(CatalogNames.INGREDIENTS.value)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalog(sender, instance, **kwargs):
+    """Bump tags catalog version."""
+    bump_catalog_version(CatalogNames.TAGS.value)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(sender, instance, raw=False, **kwargs):
+    """Invalidate cached responses showing the recipe or listing it."""
+    if raw:
+        return
+    bump_generations([
+        recipe_generation(instance.pk),
+        author_recipes_generation(instance.author_id),
+        get_generation_key(RECIPES_GENERATION),
+        *map(tag_generation, instance.tags.values_list('pk', flat=True)),
+    ])
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    # Tags are read before the through rows are deleted.
+    invalidate_saved_recipe(sender, instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, pk_set, **kwargs):
+    """Lists of added and removed tags change along with the recipe."""
+    if action == 'pre_clear' and isinstance(instance, Recipe):
+        pk_set = set(instance.tags.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if isinstance(instance, Recipe):
+        bump_generations([
+            recipe_generation(instance.pk), *map(tag_generation, pk_set)
+        ])
+    else:
+        bump_generations([
+            tag_generation(instance.pk), *map(recipe_generation, pk_set)
+        ])
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+def invalidate_favorites_count(sender, instance, **kwargs):
+    """
+    `favorites_count` is shown with the recipe.
+
+    Ingredient amounts are changed only along with `Recipe.save()`.
+    """
+    bump_generations([recipe_generation(instance.recipe_id)])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    """Author profile is shown with each of their recipes."""
+    if raw or update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_generations([author_generation(instance.pk)])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Logout deletes the token, it must stop authenticating at once."""
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    """Cached user of the tokens is stale after any change of the user."""
+    if raw or update_fields and set(update_fields) == {'last_login'}:
+        return
+    token_cache.invalidate(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(image_variants_saved, sender=Recipe)
+def invalidate_recipe_image_variants(sender, pk, **kwargs):
+    bump_generations([recipe_generation(pk)])
+
+
+@receiver(image_variants_saved, sender=User)
+def invalidate_author_avatar_variants(sender, pk, **kwargs):
+    bump_generations([author_generation(pk)])
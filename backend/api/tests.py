@@ -0,0 +1,83 @@
+import io
+import json
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.management.json_stream import iter_json_array
+from api.utils import get_catalog_version_key
+from common.enums import CatalogNames
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+User = get_user_model()
+
+
+class IterJsonArrayTests(SimpleTestCase):
+
+    def test_numbers_cut_at_every_chunk_border(self):
+        items = [
+            1.5e10, -0.25, 12, 3, 1e-7, -4e2, 0, 99999999999, 2.5,
+            {'amount': -1.0e3}, [7, 8.125], True, None, 'name',
+        ]
+        data = json.dumps(items)
+        for chunk_size in range(1, len(data) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(
+                    list(iter_json_array(io.StringIO(data), chunk_size)),
+                    items
+                )
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    },
+    CATALOG_VERSION_TTL=60,
+)
+class AnonymousRecipeCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='password',
+            first_name='Имя',
+            last_name='Фамилия'
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Омлет',
+            text='Взбить яйца и пожарить.',
+            image='recipes/omelette.png',
+            cooking_time=10
+        )
+        recipe.tags.add(Tag.objects.create(name='Завтрак', slug='breakfast'))
+        IngredientRecipe.objects.create(
+            recipe=recipe,
+            ingredient=Ingredient.objects.create(
+                name='яйца', measurement_unit='шт'
+            ),
+            amount=2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_versions_expire_after_list_hit(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        keys = [
+            get_catalog_version_key(catalog.value) for catalog in CatalogNames
+        ]
+        self.assertEqual(len(cache.get_many(keys)), len(keys))
+
+        expired_at = time.time() + settings.CATALOG_VERSION_TTL + 1
+        with mock.patch('time.time', return_value=expired_at):
+            self.assertEqual(cache.get_many(keys), {})
@@ -1,7 +1,8 @@
 from django.conf import settings
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
+from . import async_views
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 app_name = 'api_v1'
@@ -14,13 +15,47 @@ api_v1.register(r'tags', TagViewSet, basename='tags')
 api_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 api_v1.register(r'recipes', RecipeViewSet, basename='recipes')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_VIEWS:
+    # Placed before the router, so they take over its routes and names.
+    # Numeric pk keeps list level actions like `download_shopping_cart`
+    # with the router.
+    urlpatterns += [
+        re_path(
+            r'^recipes/$', async_views.recipe_list, name='recipes-list'
+        ),
+        re_path(
+            r'^recipes/(?P<pk>\d+)/$',
+            async_views.recipe_detail,
+            name='recipes-detail'
+        ),
+        re_path(r'^tags/$', async_views.tag_list, name='tags-list'),
+        re_path(
+            r'^tags/(?P<pk>\d+)/$',
+            async_views.tag_detail,
+            name='tags-detail'
+        ),
+        re_path(
+            r'^ingredients/$',
+            async_views.ingredient_list,
+            name='ingredients-list'
+        ),
+        re_path(
+            r'^ingredients/(?P<pk>\d+)/$',
+            async_views.ingredient_detail,
+            name='ingredients-detail'
+        ),
+    ]
+
+urlpatterns += [
     path('', include(api_v1.urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path(
         's/<str:link_suffix>/',
-        RecipeViewSet.as_view({'get': 'redirect_short_link'}),
+        async_views.redirect_short_link if settings.ASYNC_VIEWS
+        else RecipeViewSet.as_view({'get': 'redirect_short_link'}),
         name='short-link-redirect'
     ),
 ]
@@ -1,60 +1,260 @@
-import os
-import random
-import string
+import csv
+import hashlib
+import hmac
+import json
+from uuid import uuid4
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery, Sum
 from django.utils.timezone import now
 
-from common.enums import BooleanFields, IngredientFields
-from recipes.models import IngredientRecipe
+from common.constants import (BASE62_ALPHABET, SEARCH_CONFIG,
+                              SHORT_LINK_HALF_BITS, SHORT_LINK_HALF_MASK,
+                              SHORT_LINK_LENGTH, SHORT_LINK_ROUNDS,
+                              SHORT_LINK_SPACE)
+from common.enums import (BooleanFields, IngredientFields,
+                          RecipeAnnotationFields)
+from recipes.models import IngredientRecipe, Recipe, ShoppingListItem
 
+User = get_user_model()
 
-def generate_shopping_cart_content(user, shopping_cart_items):
-    ingredient_totals = {}
 
-    for item in shopping_cart_items:
-        recipe = item.recipe
-        for ingredient_recipe in recipe.ingredient_recipe.all():
-            ingredient = ingredient_recipe.ingredient
-            key = (ingredient.name, ingredient.measurement_unit)
-            ingredient_totals[key] = (
-                ingredient_totals.get(key, 0) + ingredient_recipe.amount
-            )
+class Echo:
+    """File-like object that returns written value instead of storing it."""
 
-    content_lines = [
-        'Shopping List\n',
-        f'Generated on: {now().strftime("%Y-%m-%d %H:%M:%S")}\n',
-    ]
+    def write(self, value):
+        return value
 
-    for recipe in shopping_cart_items.values_list(
-        'recipe__name', flat=True
-    ).distinct():
-        content_lines.append(f'\nRecipe: {recipe}')
 
-    content_lines.append('\nIngredients:\n')
-    for (name, unit), amount in ingredient_totals.items():
-        content_lines.append(f'- {name} - {amount} {unit}\n')
+def get_shopping_cart_totals(user):
+    """
+    Return ingredient totals for user's shopping cart.
 
-    return '\n'.join(content_lines)
+    Amounts are summed by the database with a single
+    `GROUP BY name, measurement_unit`.
+    """
+    return IngredientRecipe.objects.filter(
+        recipe__in_shopping_cart_of__user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('name', 'measurement_unit')
 
 
-def delete_temp_file(file_path):
-    if os.path.exists(file_path):
-        os.remove(file_path)
+def get_shopping_cart_recipe_names(user):
+    return Recipe.objects.filter(
+        in_shopping_cart_of__user=user
+    ).order_by('name').values_list('name', flat=True)
 
 
-def generate_short_link(length=5):
-    symbols = string.ascii_letters + string.digits
-    return ''.join(random.choice(symbols) for _ in range(length))
+def generate_shopping_cart_txt(user):
+    yield 'Shopping List\n'
+    yield f'Generated on: {now().strftime("%Y-%m-%d %H:%M:%S")}\n\n'
 
+    for recipe_name in get_shopping_cart_recipe_names(user).iterator():
+        yield f'Recipe: {recipe_name}\n'
 
-def get_or_create_short_link(request, recipe):
+    yield '\nIngredients:\n'
+    for item in get_shopping_cart_totals(user).iterator():
+        yield (
+            f'- {item[IngredientFields.NAME.value]} - '
+            f'{item[IngredientFields.AMOUNT.value]} '
+            f'{item[IngredientFields.MEASUREMENT_UNIT.value]}\n'
+        )
+
+
+def generate_shopping_cart_csv(user):
+    writer = csv.writer(Echo())
+    yield writer.writerow((
+        IngredientFields.NAME.value,
+        IngredientFields.AMOUNT.value,
+        IngredientFields.MEASUREMENT_UNIT.value,
+    ))
+    for item in get_shopping_cart_totals(user).iterator():
+        yield writer.writerow((
+            item[IngredientFields.NAME.value],
+            item[IngredientFields.AMOUNT.value],
+            item[IngredientFields.MEASUREMENT_UNIT.value],
+        ))
+
+
+def generate_shopping_cart_json(user):
+    recipes = list(get_shopping_cart_recipe_names(user))
+    yield (
+        f'{{"generated_on": {json.dumps(now().isoformat())}, '
+        f'"recipes": {json.dumps(recipes, ensure_ascii=False)}, '
+        '"ingredients": ['
+    )
+    separator = ''
+    for item in get_shopping_cart_totals(user).iterator():
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ', '
+    yield ']}'
+
+
+SHOPPING_CART_GENERATORS = {
+    'txt': generate_shopping_cart_txt,
+    'csv': generate_shopping_cart_csv,
+    'json': generate_shopping_cart_json,
+}
+
+
+def generate_shopping_cart_content(user, file_format):
+    """
+    Yield shopping list of user in requested format line by line.
+
+    Supported formats are `txt`, `csv` and `json`.
+    """
+    return SHOPPING_CART_GENERATORS[file_format](user)
+
+
+def get_recipe_amounts(recipe):
+    """Return `{ingredient_id: amount}` mapping for the recipe."""
+    return dict(
+        recipe.ingredient_recipe.values_list('ingredient_id', 'amount')
+    )
+
+
+def update_shopping_list(user_ids, deltas):
+    """
+    Apply ingredient amount changes to users' materialized shopping lists.
+
+    Args:
+        user_ids (Iterable[int]): Ids of users whose lists are affected.
+        deltas (dict): `{ingredient_id: amount_delta}`, negative deltas
+                       decrease totals, rows reaching zero are deleted.
+
+    Must be called inside a transaction. Users are locked with
+    `SELECT ... FOR UPDATE` in id order first: locks of existing items do
+    not cover items about to be created, and concurrent updates of the same
+    user would both insert them and violate `unique_shopping_list_item`.
+    """
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not user_ids or not deltas:
+        return
+
+    list(
+        User.objects.select_for_update().filter(
+            pk__in=user_ids
+        ).order_by('pk').values_list('pk', flat=True)
+    )
+    existing_items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+    }
+    items_to_create = []
+    items_to_update = []
+    items_to_delete = []
+
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            item = existing_items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    items_to_create.append(
+                        ShoppingListItem(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta
+                        )
+                    )
+                continue
+
+            item.amount += delta
+            if item.amount > 0:
+                items_to_update.append(item)
+            else:
+                items_to_delete.append(item.pk)
+
+    ShoppingListItem.objects.bulk_create(items_to_create)
+    ShoppingListItem.objects.bulk_update(items_to_update, ('amount',))
+    ShoppingListItem.objects.filter(pk__in=items_to_delete).delete()
+
+
+def get_amount_deltas(old_amounts, new_amounts):
+    """Return `{ingredient_id: new - old}` for changed ingredients."""
+    return {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+
+
+def feistel_round(value, round_number):
+    """Keyed round function of the short link permutation."""
+    digest = hmac.new(
+        settings.SHORT_LINK_SECRET.encode(),
+        f'{round_number}:{value}'.encode(),
+        hashlib.sha256
+    ).digest()
+    return int.from_bytes(digest[:4], 'big') & SHORT_LINK_HALF_MASK
+
+
+def permute_recipe_id(recipe_id):
+    """
+    Map recipe id to a unique pseudo-random number below `62 ** length`.
+
+    A keyed Feistel network is a bijection on `2 * half_bits` bit
+    numbers, cycle walking keeps the result inside the code space, so
+    different ids never get the same code.
+    """
+    value = recipe_id
+    while True:
+        left = value >> SHORT_LINK_HALF_BITS
+        right = value & SHORT_LINK_HALF_MASK
+        for round_number in range(SHORT_LINK_ROUNDS):
+            left, right = right, left ^ feistel_round(right, round_number)
+        value = (left << SHORT_LINK_HALF_BITS) | right
+        if value < SHORT_LINK_SPACE:
+            return value
+
+
+def generate_short_link(recipe_id):
+    """Return fixed length base62 code derived from recipe id."""
+    number = permute_recipe_id(recipe_id)
+    symbols = []
+    for _ in range(SHORT_LINK_LENGTH):
+        number, remainder = divmod(number, len(BASE62_ALPHABET))
+        symbols.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(symbols))
+
+
+def assign_short_link(recipe):
+    """
+    Assign short link to recipe with a single `UPDATE`.
+
+    The code is derived from the recipe id, so concurrent requests
+    compute the same value and `WHERE short_link IS NULL` makes the
+    write idempotent. No model `save()` (and its signals) is involved.
+    """
     if recipe.short_link:
-        return request.build_absolute_uri(f'/s/{recipe.short_link}')
+        return recipe.short_link
 
-    short_link = generate_short_link()
+    short_link = generate_short_link(recipe.pk)
+    Recipe.objects.filter(
+        pk=recipe.pk, short_link__isnull=True
+    ).update(short_link=short_link)
     recipe.short_link = short_link
-    recipe.save()
+    return short_link
+
 
+def get_or_create_short_link(request, recipe):
+    short_link = assign_short_link(recipe)
     return request.build_absolute_uri(f'/s/{short_link}')
 
 
@@ -76,3 +276,130 @@ def bulk_create_ingredients(recipe, ingredients):
         for ingredient in ingredients
     ]
     IngredientRecipe.objects.bulk_create(ingredient_instances)
+
+
+def update_recipe_ingredients(recipe, ingredients):
+    """
+    Bring recipe ingredients in line with submitted ones using a diff.
+
+    New rows are bulk inserted, changed amounts are bulk updated and
+    removed rows are deleted with one statement, untouched rows are
+    left as is.
+
+    Returns:
+        dict: `{ingredient_id: amount}` of the recipe before the update.
+    """
+    existing_rows = {
+        row.ingredient_id: row
+        for row in recipe.ingredient_recipe.all()
+    }
+    old_amounts = {
+        ingredient_id: row.amount
+        for ingredient_id, row in existing_rows.items()
+    }
+    new_amounts = {
+        ingredient[IngredientFields.ID.value]:
+            ingredient[IngredientFields.AMOUNT.value]
+        for ingredient in ingredients
+    }
+
+    rows_to_create = []
+    rows_to_update = []
+    for ingredient_id, amount in new_amounts.items():
+        row = existing_rows.get(ingredient_id)
+        if row is None:
+            rows_to_create.append(
+                IngredientRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+            )
+        elif row.amount != amount:
+            row.amount = amount
+            rows_to_update.append(row)
+    ingredient_ids_to_delete = existing_rows.keys() - new_amounts.keys()
+
+    if rows_to_create:
+        IngredientRecipe.objects.bulk_create(rows_to_create)
+    if rows_to_update:
+        IngredientRecipe.objects.bulk_update(rows_to_update, ('amount',))
+    if ingredient_ids_to_delete:
+        recipe.ingredient_recipe.filter(
+            ingredient_id__in=ingredient_ids_to_delete
+        ).delete()
+
+    return old_amounts
+
+
+def parse_recipes_limit(recipes_limit):
+    """Return `recipes_limit` query param as positive int or None."""
+    try:
+        recipes_limit = int(recipes_limit)
+    except (TypeError, ValueError):
+        return None
+    return recipes_limit if recipes_limit > 0 else None
+
+
+def limit_recipes_per_author(queryset, recipes_limit):
+    """
+    Keep only the `recipes_limit` newest recipes of every author.
+
+    Every recipe is matched against a correlated subquery of its
+    author's newest recipe ids (served by `recipe_author_pub_date_idx`),
+    so the queryset can be used in a single `Prefetch` for a whole page
+    of authors.
+    """
+    newest_ids = queryset.model.objects.filter(
+        author_id=OuterRef('author_id')
+    ).order_by('-pub_date', '-id').values('id')[:recipes_limit]
+    return queryset.filter(id__in=Subquery(newest_ids))
+
+
+def get_catalog_version_key(catalog_name):
+    return f'catalog_version:{catalog_name}'
+
+
+def get_catalog_version(catalog_name):
+    """Return current version token of the catalog (tags, ingredients)."""
+    return cache.get_or_set(
+        get_catalog_version_key(catalog_name),
+        uuid4().hex,
+        timeout=settings.CATALOG_VERSION_TTL
+    )
+
+
+def get_catalog_etag(catalog_name, full_path, renderer_format):
+    """Return strong ETag of catalog response for the URL and format."""
+    version = get_catalog_version(catalog_name)
+    digest = hashlib.md5(
+        f'{full_path}:{renderer_format}'.encode()
+    ).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def bump_catalog_version(catalog_name):
+    """Set new version token, so cached catalog responses become stale."""
+    cache.set(
+        get_catalog_version_key(catalog_name),
+        uuid4().hex,
+        timeout=settings.CATALOG_VERSION_TTL
+    )
+
+
+def search_recipes(queryset, value):
+    """
+    Full-text search of recipes by name and text, best matches first.
+
+    On PostgreSQL the query is matched against the trigger-maintained
+    `search_vector` (GIN index) and ranked with `ts_rank`, other
+    databases fall back to case-insensitive substring matching.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        )
+
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+    rank = RecipeAnnotationFields.SEARCH_RANK.value
+    return queryset.filter(search_vector=query).annotate(
+        **{rank: SearchRank(F('search_vector'), query)}
+    ).order_by(f'-{rank}', '-pub_date', '-id')
@@ -1,30 +1,37 @@
-from tempfile import NamedTemporaryFile
-
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status
+from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            Tag)
+from common.enums import CatalogNames, RecipeAnnotationFields
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
 from users.models import FollowUser
 from .filters import IngredientsSearchFilter, RecipeFilter
-from .mixins import (BaseRecipeViewSetMixin, BaseUserViewSetMixin,
-                     TagIngredientViewSetMixin)
-from .pagination import PageLimitPagination
+from .mixins import (AnonymousRecipeCacheMixin, BaseRecipeViewSetMixin,
+                     BaseUserViewSetMixin, TagIngredientViewSetMixin)
+from .pagination import PageLimitPagination, RecipeKeysetPagination
 from .permissions import IsAuthorOrReadOnly
+from .renderers import CSVRenderer, PlainTextRenderer
 from .serializers import (AvatarSerializer, FollowUserSerializer,
                           IngredientSerializer, RecipeCreateSerializer,
-                          RecipeDetailSerializer, ShortenedRecipeSerializer,
-                          TagSerializer, UserSerializer)
-from .utils import (delete_temp_file, generate_shopping_cart_content,
-                    get_or_create_short_link)
+                          RecipeDetailSerializer, ShoppingListItemSerializer,
+                          ShortenedRecipeSerializer, TagSerializer,
+                          UserSerializer)
+from .utils import (generate_shopping_cart_content, get_amount_deltas,
+                    get_or_create_short_link, get_recipe_amounts,
+                    limit_recipes_per_author, parse_recipes_limit,
+                    update_shopping_list)
 
 User = get_user_model()
 
@@ -61,6 +68,7 @@ class UserViewSet(BaseUserViewSetMixin):
     @avatar.mapping.delete
     def delete_avatar(self, request):
         request.user.avatar = None
+        request.user.avatar_variants = None
         request.user.save()
         return Response(
             {'detail': 'Avatar has been deleted.'},
@@ -74,9 +82,18 @@ class UserViewSet(BaseUserViewSetMixin):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        followed_users = User.objects.filter(followed__user=request.user)
-        page = self.paginate_queryset(followed_users)
         recipes_limit = request.query_params.get('recipes_limit')
+        recipes = Recipe.objects.filter(author__followed__user=request.user)
+        limit = parse_recipes_limit(recipes_limit)
+        if limit:
+            recipes = limit_recipes_per_author(recipes, limit)
+
+        followed_users = User.objects.filter(
+            followed__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        )
+        page = self.paginate_queryset(followed_users)
 
         serializer = FollowUserSerializer(
             page or followed_users,
@@ -125,33 +142,102 @@ class UserViewSet(BaseUserViewSetMixin):
 class IngredientViewSet(TagIngredientViewSetMixin):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientsSearchFilter, filters.SearchFilter,)
-    search_fields = ('name',)
+    catalog_name = CatalogNames.INGREDIENTS.value
+    filter_backends = (IngredientsSearchFilter,)
     max_results = 20
 
 
-class RecipeViewSet(BaseRecipeViewSetMixin):
+class RecipeViewSet(AnonymousRecipeCacheMixin, BaseRecipeViewSetMixin):
     queryset = Recipe.objects.prefetch_related(
-        'ingredients',
+        Prefetch(
+            'ingredient_recipe',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        ),
         'tags',
     ).select_related(
         'author'
+    ).defer(
+        'search_vector'
     )
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     http_method_names = ('get', 'post', 'patch', 'delete',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = PageLimitPagination
+    keyset_pagination_class = RecipeKeysetPagination
+
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination if `cursor` query param is passed.
+
+        Page/limit pagination stays the default one for the frontend and
+        is kept for `search`, keyset ordering would drop relevance order.
+        """
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            if (
+                self.keyset_pagination_class.cursor_query_param
+                in query_params
+                and not query_params.get('search')
+            ):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_serializer_class(self):
         if self.action in ['create', 'partial_update']:
             return RecipeCreateSerializer
         return RecipeDetailSerializer
 
+    def get_queryset(self):
+        """
+        Annotate recipes with per-user flags in the same query.
+
+        `is_favorited` and `is_in_shopping_cart` are resolved with
+        `Exists()` subqueries, so serializing a page of recipes does not
+        cost extra queries per recipe. Anonymous users get constant
+        `False` values.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        if user.is_anonymous:
+            return queryset.annotate(**{
+                RecipeAnnotationFields.IS_FAVORITED.value: Value(
+                    False, output_field=BooleanField()
+                ),
+                RecipeAnnotationFields.IS_IN_SHOPPING_CART.value: Value(
+                    False, output_field=BooleanField()
+                ),
+            })
+
+        return queryset.annotate(**{
+            RecipeAnnotationFields.IS_FAVORITED.value: Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+            RecipeAnnotationFields.IS_IN_SHOPPING_CART.value: Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+        })
+
     def perform_create(self, serializer):
         serializer.is_valid(raise_exception=True)
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, recipe):
+        update_shopping_list(
+            recipe.in_shopping_cart_of.values_list('user_id', flat=True),
+            get_amount_deltas(get_recipe_amounts(recipe), {})
+        )
+        recipe.delete()
+
     @action(
         detail=True,
         methods=['get'],
@@ -235,7 +321,9 @@ class RecipeViewSet(BaseRecipeViewSetMixin):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        ShoppingCart.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            update_shopping_list([user.id], get_recipe_amounts(recipe))
 
         serializer = ShortenedRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -254,7 +342,11 @@ class RecipeViewSet(BaseRecipeViewSetMixin):
         shopping_cart_item = get_object_or_404(
             ShoppingCart, user=user, recipe=recipe
         )
-        shopping_cart_item.delete()
+        with transaction.atomic():
+            shopping_cart_item.delete()
+            update_shopping_list(
+                [user.id], get_amount_deltas(get_recipe_amounts(recipe), {})
+            )
         return Response(
             {'detail': 'Recipe removed from shopping cart.'},
             status=status.HTTP_204_NO_CONTENT
@@ -263,33 +355,56 @@ class RecipeViewSet(BaseRecipeViewSetMixin):
     @action(
         detail=False,
         methods=['get'],
-        url_path='download_shopping_cart',
+        url_path='shopping_cart_summary',
         permission_classes=[IsAuthenticated]
     )
-    def download_shopping_cart(self, request):
-        user = request.user
-        shopping_cart_items = ShoppingCart.objects.filter(
-            user=user
-        ).prefetch_related('recipe__ingredients')
-
-        content = generate_shopping_cart_content(user, shopping_cart_items)
+    def shopping_cart_summary(self, request):
+        """Return materialized ingredient totals of user's shopping cart."""
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+        serializer = ShoppingListItemSerializer(items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-        with NamedTemporaryFile(delete=False, suffix='.txt') as tmp_file:
-            tmp_file.write(content.encode('utf-8'))
-            tmp_file_path = tmp_file.name
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='download_shopping_cart',
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer]
+    )
+    def download_shopping_cart(self, request):
+        """
+        Stream user's shopping list as a file attachment (built at once
+        under ASGI).
 
-        response = FileResponse(
-            open(tmp_file_path, 'rb'),
-            content_type='text/plain'
-        )
+        Output format is chosen with `?format=txt|csv|json` (or `Accept`
+        header), plain text is the default one.
+        """
+        user = request.user
+        renderer = request.accepted_renderer
+        content = generate_shopping_cart_content(user, renderer.format)
+        content_type = f'{renderer.media_type}; charset=utf-8'
+
+        if isinstance(request._request, ASGIRequest):
+            # Django 3.2 iterates streaming content in the event loop,
+            # where queries of the generator are not allowed, so the list
+            # is built here, in the thread of the view.
+            response = HttpResponse(
+                ''.join(content), content_type=content_type
+            )
+        else:
+            response = StreamingHttpResponse(
+                content, content_type=content_type
+            )
         response['Content-Disposition'] = (
-            f'attachment; filename="shopping_list_{user.username}.txt"'
+            'attachment; '
+            f'filename="shopping_list_{user.username}.{renderer.format}"'
         )
-
-        response.close = lambda: delete_temp_file(tmp_file_path)
         return response
 
 
 class TagViewSet(TagIngredientViewSetMixin):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalog_name = CatalogNames.TAGS.value
@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import ThreadSensitiveContext
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+
+class ThreadSensitiveASGIHandler(ASGIHandler):
+    """
+    Run synchronous code of each request in its own thread.
+
+    Django 3.2 runs all sync views and middleware of the process in a
+    single thread, so one slow view stalls every other request. Django 4.0
+    gives each request its own thread sensitive context, this backports it.
+    """
+
+    async def __call__(self, scope, receive, send):
+        async with ThreadSensitiveContext():
+            await super().__call__(scope, receive, send)
+
+
+django.setup(set_prefix=False)
+application = ThreadSensitiveASGIHandler()
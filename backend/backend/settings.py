@@ -10,6 +10,9 @@ load_dotenv()
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 
+# Key of the recipe id permutation used for short links.
+SHORT_LINK_SECRET = os.getenv('SHORT_LINK_SECRET', SECRET_KEY)
+
 DEBUG = os.getenv('DEBUG') == 'True'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
@@ -22,7 +25,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -34,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.MetricsMiddleware',
+    'common.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,9 +45,20 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# debug_toolbar is heavy and unsafe in production, development only.
+DEBUG_TOOLBAR = DEBUG and os.getenv('DEBUG_TOOLBAR', 'True') == 'True'
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Server-Timing header (db, serialize, total) on every response, requests
+# over any budget are logged with the view name.
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', 20))
+REQUEST_TIME_BUDGET = int(os.getenv('REQUEST_TIME_BUDGET', 500))
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -68,6 +83,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Async views of recipe, tag and ingredient reads and short links,
+# the backend is served by uvicorn workers then (see entrypoint.sh).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -81,6 +102,22 @@ DATABASES = {
         'PORT': os.getenv('DB_PORT', 5432)
     }
 }
+
+# Optional streaming replica, `GET`/`HEAD` API requests read from it.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['common.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE.append('common.db_router.ReplicaRoutingMiddleware')
+
+REPLICA_PATHS = ('/api/',)
+# Clients read from primary for this many seconds after a write.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 # For development only!
 # DATABASES = {
 #     'default': {
@@ -89,6 +126,30 @@ DATABASES = {
 #     }
 # }
 
+# Default LocMemCache is process-local, set a shared backend (e.g.
+# FileBasedCache or memcached) to share cached data between workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Lifetime of cached anonymous recipe responses, they are invalidated
+# by generation tokens earlier, the timeout bounds any missed change.
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 300))
+
+# Version tokens of tag and ingredient catalogs (ETags, tag slug map).
+# Process-local cache never sees bumps of other processes, so there
+# versions expire and workers pick up changes within this many seconds.
+CATALOG_VERSION_TTL = (
+    int(os.getenv('CATALOG_VERSION_TTL', 60))
+    if CACHES['default']['BACKEND'].endswith('.LocMemCache')
+    else None
+)
+
 # Set User model from users app as a default.
 AUTH_USER_MODEL = 'users.User'
 
@@ -123,7 +184,7 @@ DJOSER = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -138,6 +199,15 @@ REST_FRAMEWORK = {
 }
 
 
+# Token to user lookups are cached in every worker for TOKEN_CACHE_TTL
+# seconds (other workers see logout only after it) and, if
+# TOKEN_CACHE_SHARED is on, in the default cache as well.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 10))
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', 'False') == 'True'
+TOKEN_CACHE_SHARED_TTL = int(os.getenv('TOKEN_CACHE_SHARED_TTL', 300))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -161,6 +231,11 @@ STATIC_ROOT = BASE_DIR / 'backend_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized WebP/JPEG variants of uploaded images are rendered by
+# a background thread pool of every worker process.
+IMAGE_VARIANTS_ASYNC = os.getenv('IMAGE_VARIANTS_ASYNC', 'True') == 'True'
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
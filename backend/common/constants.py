@@ -8,3 +8,23 @@ MIN_VALUE = 1
 MAX_VALUE = 32767
 SLUG_REGEX = r'^[-a-zA-Z0-9_]+$'
 USERNAME_REGEX = r'^[\w.@+-]+\Z'
+BASE62_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_LINK_LENGTH = 6
+SHORT_LINK_HALF_BITS = 18
+SHORT_LINK_ROUNDS = 4
+SHORT_LINK_HALF_MASK = (1 << SHORT_LINK_HALF_BITS) - 1
+SHORT_LINK_SPACE = len(BASE62_ALPHABET) ** SHORT_LINK_LENGTH
+IMAGE_VARIANT_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_VARIANT_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+IMAGE_VARIANT_QUALITY = 80
+SEARCH_CONFIG = 'russian'
+JSON_MEDIA_TYPES = ('application/json', '*/*')
@@ -0,0 +1,90 @@
+import hashlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from common.middleware import SyncAsyncMiddleware
+
+REPLICA_DB_ALIAS = 'replica'
+PRIMARY_PIN_COOKIE = 'primary_pin'
+PRIMARY_PIN_KEY_PREFIX = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+REPLICA_METHODS = ('GET', 'HEAD')
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of requests marked by `ReplicaRoutingMiddleware` to the
+    replica, everything else (writes, admin, management commands) to
+    the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if use_replica.get():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica holds the same data as primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_primary_pin_key(request):
+    """Cache key of the client pinned by its `Authorization` header."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.md5(authorization.encode()).hexdigest()
+    return f'{PRIMARY_PIN_KEY_PREFIX}:{digest}'
+
+
+class ReplicaRoutingMiddleware(SyncAsyncMiddleware):
+    """
+    Serve `GET`/`HEAD` API requests from the replica.
+
+    A client which has just written is pinned to the primary for
+    `REPLICA_PIN_SECONDS` to read its own writes despite replication
+    lag: API clients by the `Authorization` header in cache (shared
+    between workers only with a shared cache backend), browsers also
+    by a short-lived cookie.
+    """
+
+    def start(self, request):
+        return use_replica.set(self.can_use_replica(request))
+
+    def cleanup(self, state):
+        use_replica.reset(state)
+
+    def finish(self, request, response, state):
+        if request.method not in SAFE_METHODS:
+            self.pin_to_primary(request, response)
+        return response
+
+    def can_use_replica(self, request):
+        if (
+            request.method not in REPLICA_METHODS
+            or not request.path.startswith(settings.REPLICA_PATHS)
+            or PRIMARY_PIN_COOKIE in request.COOKIES
+        ):
+            return False
+        pin_key = get_primary_pin_key(request)
+        return pin_key is None or not cache.get(pin_key)
+
+    def pin_to_primary(self, request, response):
+        pin_seconds = settings.REPLICA_PIN_SECONDS
+        pin_key = get_primary_pin_key(request)
+        if pin_key is not None:
+            cache.set(pin_key, True, pin_seconds)
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE, '1', max_age=pin_seconds, httponly=True
+        )
@@ -19,6 +19,9 @@ class RecipeFields(Enum):
     NAME = 'name'
     TEXT = 'text'
     COOKING_TIME = 'cooking_time'
+    PUB_DATE = 'pub_date'
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
 
 
 class FollowUserFields(Enum):
@@ -52,6 +55,17 @@ class RecipeRelatedFields(Enum):
     IS_IN_SHOPPING_CART = 'in_shopping_cart_of'
 
 
+class RecipeAnnotationFields(Enum):
+    IS_FAVORITED = 'is_favorited'
+    IS_IN_SHOPPING_CART = 'is_in_shopping_cart'
+    SEARCH_RANK = 'search_rank'
+
+
+class CatalogNames(Enum):
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+
+
 class ObjectNames(Enum):
     INGREDIENTS = 'ingredients'
     TAGS = 'tags'
@@ -0,0 +1,201 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from .constants import (IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY,
+                        IMAGE_VARIANT_SIZES)
+
+logger = logging.getLogger(__name__)
+
+# Sent with `pk` after variants are stored with a queryset `UPDATE`,
+# which sends no model signals.
+image_variants_saved = Signal()
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANTS_WORKERS,
+    thread_name_prefix='image-variants'
+)
+
+
+def get_variant_name(image_name, size_name, extension):
+    """Return storage name of variant: `recipes/variants/<stem>_card.webp`."""
+    directory, file_name = os.path.split(image_name)
+    stem = os.path.splitext(file_name)[0]
+    return os.path.join(
+        directory, 'variants', f'{stem}_{size_name}.{extension}'
+    )
+
+
+def render_variants(image_file):
+    """
+    Yield `(size_name, extension, content)` for every variant of the image.
+
+    Every size is fit into its bounding box keeping the aspect ratio and
+    encoded in every format of `IMAGE_VARIANT_FORMATS`.
+    """
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA', 'P')
+        original = original.convert('RGBA' if has_alpha else 'RGB')
+
+        for size_name, size in IMAGE_VARIANT_SIZES.items():
+            variant = original.copy()
+            variant.thumbnail(size, Image.LANCZOS)
+            for extension, image_format in IMAGE_VARIANT_FORMATS.items():
+                output = variant
+                if image_format == 'JPEG' and variant.mode != 'RGB':
+                    output = Image.new('RGB', variant.size, 'white')
+                    output.paste(variant, mask=variant.getchannel('A'))
+                buffer = BytesIO()
+                output.save(
+                    buffer,
+                    image_format,
+                    quality=IMAGE_VARIANT_QUALITY,
+                    optimize=True
+                )
+                yield size_name, extension, buffer.getvalue()
+
+
+def generate_image_variants(model, pk, field_name, variants_field_name):
+    """
+    Generate resized variants of the image and store their names.
+
+    The variants are saved with `UPDATE ... WHERE image = <processed
+    name>`, so if the image was replaced meanwhile the result is dropped.
+    """
+    instance = model.objects.filter(pk=pk).only(field_name).first()
+    image = getattr(instance, field_name, None)
+    if not image:
+        return None
+
+    variants = {}
+    with image.open('rb') as image_file:
+        for size_name, extension, content in render_variants(image_file):
+            variant_name = get_variant_name(
+                image.name, size_name, extension
+            )
+            image.storage.delete(variant_name)
+            variants.setdefault(size_name, {})[extension] = (
+                image.storage.save(variant_name, ContentFile(content))
+            )
+
+    updated = model.objects.filter(
+        pk=pk, **{field_name: image.name}
+    ).update(**{variants_field_name: variants})
+    if not updated:
+        for formats in variants.values():
+            for name in formats.values():
+                image.storage.delete(name)
+        return None
+    image_variants_saved.send(sender=model, pk=pk)
+    return variants
+
+
+def run_in_background(task):
+    """Run `task` in the worker thread with its own DB connection."""
+    close_old_connections()
+    try:
+        task()
+    except Exception:
+        logger.exception('Background image task failed.')
+    finally:
+        close_old_connections()
+
+
+def run_after_commit(task):
+    """
+    Run `task` once the current transaction commits.
+
+    The task goes to the background thread pool unless
+    `IMAGE_VARIANTS_ASYNC` is disabled, then it runs right after
+    the commit in the same thread.
+    """
+    if settings.IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_background, task)
+        )
+    else:
+        transaction.on_commit(task)
+
+
+def schedule_image_variants(instance, field_name, variants_field_name):
+    """Queue generation of image variants once the transaction commits."""
+    run_after_commit(
+        partial(
+            generate_image_variants,
+            type(instance), instance.pk, field_name, variants_field_name
+        )
+    )
+
+
+def get_variant_names(image_name):
+    return [
+        get_variant_name(image_name, size_name, extension)
+        for size_name in IMAGE_VARIANT_SIZES
+        for extension in IMAGE_VARIANT_FORMATS
+    ]
+
+
+def delete_image_files(storage, image_name):
+    """Delete the image and all of its variants from the storage."""
+    for name in (image_name, *get_variant_names(image_name)):
+        storage.delete(name)
+
+
+def schedule_image_deletion(storage, image_name):
+    """Delete image file and its variants in background after commit."""
+    if image_name:
+        run_after_commit(partial(delete_image_files, storage, image_name))
+
+
+def get_original_attr(field_name):
+    return f'_original_{field_name}'
+
+
+def remember_image_name(instance, field_name):
+    """
+    Remember image name the instance was loaded (or saved) with.
+
+    Reads the raw value from `__dict__`, so deferred fields are not
+    loaded and no query is made.
+    """
+    if field_name not in instance.__dict__:
+        return
+    value = instance.__dict__[field_name]
+    setattr(
+        instance,
+        get_original_attr(field_name),
+        getattr(value, 'name', value) or ''
+    )
+
+
+def get_replaced_image_name(instance, field_name, update_fields=None):
+    """
+    Return name of the image file being replaced or removed by save.
+
+    Returns `None` if the image is not changed. The database is queried
+    only if the image field was deferred when the instance was loaded.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and field_name not in update_fields:
+        return None
+
+    original_name = getattr(instance, get_original_attr(field_name), None)
+    if original_name is None:
+        original_name = type(instance).objects.filter(
+            pk=instance.pk
+        ).values_list(field_name, flat=True).first()
+
+    current_name = getattr(instance, field_name).name or ''
+    if original_name and original_name != current_name:
+        return original_name
+    return None
@@ -0,0 +1,80 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+# With PROMETHEUS_MULTIPROC_DIR set every gunicorn worker writes samples
+# to its own mmap-backed files in the directory and the collector sums
+# them on scrape, so any worker answers with totals of all of them.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+UNMATCHED_VIEW = 'unmatched'
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+RESPONSE_SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(9))
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Requests by view, method and status code.',
+    ('view', 'method', 'status')
+)
+ERRORS = Counter(
+    'foodgram_http_errors_total',
+    'Responses with 4xx and 5xx status codes by view.',
+    ('view', 'status_class')
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Request processing time by view.',
+    ('view', 'method')
+)
+DB_QUERIES = Histogram(
+    'foodgram_http_request_db_queries',
+    'Number of SQL queries per request by view.',
+    ('view',),
+    buckets=QUERY_COUNT_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_http_response_size_bytes',
+    'Response body size by view, streaming responses are not counted.',
+    ('view',),
+    buckets=RESPONSE_SIZE_BUCKETS
+)
+
+
+def get_view_label(request):
+    """
+    Return url name of the resolved view, e.g. `recipes-list`.
+
+    Url names are a bounded set, unresolved paths share one label.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None or not resolver_match.url_name:
+        return UNMATCHED_VIEW
+    return resolver_match.url_name
+
+
+def observe_request(request, response, duration, query_count):
+    view = get_view_label(request)
+    status = response.status_code
+    REQUESTS.labels(view, request.method, status).inc()
+    if status >= 400:
+        ERRORS.labels(view, f'{status // 100}xx').inc()
+    LATENCY.labels(view, request.method).observe(duration)
+    if query_count is not None:
+        DB_QUERIES.labels(view).observe(query_count)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(view).observe(len(response.content))
+
+
+def metrics_view(request):
+    """Return metrics of all worker processes in Prometheus format."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from common.metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+# Context variables are copied to `sync_to_async` threads, so queries of
+# async views are counted for their request as well.
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+class QueryStats:
+    """Number of queries of the request and their total duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """`execute_wrapper` adding the query to stats of current request."""
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.duration += time.perf_counter() - start
+        stats.count += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class SyncAsyncMiddleware:
+    """
+    Middleware running `start` and `finish` hooks around both sync and
+    async handlers.
+
+    Under ASGI hooks are called in the event loop without a thread hop,
+    so they must stay cheap (local state and cache lookups only).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Marks the instance as a coroutine function for Django.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.cleanup(state)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.cleanup(state)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        return None
+
+    def cleanup(self, state):
+        pass
+
+    def finish(self, request, response, state):
+        return response
+
+
+class ServerTimingMiddleware(SyncAsyncMiddleware):
+    """
+    Measure database and application time of every request.
+
+    Adds `Server-Timing` header with `db` (time of all queries),
+    `serialize` (the rest of the view and rendering time) and `total`
+    metrics. Requests exceeding `REQUEST_QUERY_BUDGET` queries or
+    `REQUEST_TIME_BUDGET` milliseconds are logged with the name of the
+    view. Body of streaming responses is produced after the middleware
+    and is not measured.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Connections opened before the middleware was loaded.
+        for connection in connections.all():
+            install_query_recorder(None, connection)
+
+    def start(self, request):
+        stats = QueryStats()
+        request._query_stats = stats
+        return time.perf_counter(), current_query_stats.set(stats)
+
+    def cleanup(self, state):
+        current_query_stats.reset(state[1])
+
+    def finish(self, request, response, state):
+        stats = request._query_stats
+        total = time.perf_counter() - state[0]
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = (
+                f'db;dur={stats.duration * 1000:.1f};'
+                f'desc="{stats.count} queries", '
+                f'serialize;dur={(total - stats.duration) * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        self.check_budgets(request, response, stats, total)
+        return response
+
+    def check_budgets(self, request, response, stats, total):
+        if (
+            stats.count <= settings.REQUEST_QUERY_BUDGET
+            and total * 1000 <= settings.REQUEST_TIME_BUDGET
+        ):
+            return
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else None
+        logger.warning(
+            f'Request over budget: {request.method} {request.path} '
+            f'view={view_name} status={response.status_code} '
+            f'queries={stats.count} db={stats.duration * 1000:.1f}ms '
+            f'total={total * 1000:.1f}ms'
+        )
+
+
+class MetricsMiddleware(SyncAsyncMiddleware):
+    """
+    Export request metrics in Prometheus format.
+
+    Must be placed before `ServerTimingMiddleware`, query counts are
+    taken from its per-request stats.
+    """
+
+    def start(self, request):
+        return time.perf_counter()
+
+    def finish(self, request, response, state):
+        stats = getattr(request, '_query_stats', None)
+        observe_request(
+            request,
+            response,
+            time.perf_counter() - state,
+            stats.count if stats is not None else None
+        )
+        return response
@@ -0,0 +1,27 @@
+class CounterFieldsMixin:
+    """
+    Keep denormalized counters out of updates made by `save()`.
+
+    Counters are changed only by atomic `F()` updates (see
+    `common.utils.update_counter`), a full save would write back the
+    loaded value and lose concurrent increments. Inserts and saves with
+    explicit `update_fields` are left as is.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred_fields = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred_fields
+            ]
+        super().save(*args, **kwargs)
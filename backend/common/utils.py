@@ -0,0 +1,33 @@
+from django.db import connections, router
+from django.db.models import F, Max
+
+
+def update_counter(model, pk, field, delta):
+    """
+    Atomically change counter column of the row by `delta`.
+
+    Uses `UPDATE ... SET field = field + delta`, decrements never make
+    the counter negative, `recount` command repairs any drift.
+    """
+    if pk is None:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bulk_create_with_ids(model, objs, batch_size=None):
+    """
+    `bulk_create` objects making sure their primary keys are set.
+
+    Backends without `RETURNING` support leave `pk` empty, ids are
+    reserved after the current maximum instead, so the call must run
+    inside the transaction of the whole write.
+    """
+    connection = connections[router.db_for_write(model)]
+    if not connection.features.can_return_rows_from_bulk_insert:
+        last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk']
+        for pk, obj in enumerate(objs, start=(last_pk or 0) + 1):
+            obj.pk = pk
+    return model.objects.bulk_create(objs, batch_size=batch_size)
@@ -3,4 +3,14 @@ python manage.py migrate --no-input
 python manage.py collectstatic --no-input
 cp -r /app/backend_static/. /backend_static/static/
 python manage.py import_json
-gunicorn --bind 0.0.0.0:8000 backend.wsgi
\ No newline at end of file
+# Metrics of gunicorn workers are shared through files of this directory,
+# stale files of the previous run must not be summed up.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+# Async views need an ASGI server, uvicorn workers under gunicorn.
+if [ "$ASYNC_VIEWS" = "True" ]; then
+    gunicorn --bind 0.0.0.0:8000 -k uvicorn.workers.UvicornWorker backend.asgi
+else
+    gunicorn --bind 0.0.0.0:8000 backend.wsgi
+fi
\ No newline at end of file
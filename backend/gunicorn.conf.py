@@ -0,0 +1,7 @@
+# Loaded by gunicorn from the working directory.
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,7 @@
 from django.contrib import admin
-from django.db import models
 
 from .models import (FavoriteRecipe, Ingredient, IngredientRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, Tag)
 
 
 class IngredientRecipeInline(admin.TabularInline):
@@ -18,7 +17,7 @@ class IngredientRecipeInline(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name', 'author', 'pub_date',
-        'cooking_time', 'short_link', 'favorite_count',
+        'cooking_time', 'short_link', 'favorites_count',
     )
     search_fields = ('name', 'author__username',)
     list_filter = ('author', 'tags',)
@@ -30,15 +29,8 @@ class RecipeAdmin(admin.ModelAdmin):
             'author'
         ).prefetch_related(
             'ingredients', 'tags'
-        ).annotate(
-            favorite_count=models.Count('favorited_by')
         )
 
-    def favorite_count(self, obj):
-        return obj.favorite_count
-
-    favorite_count.short_description = 'количество подписок'
-
 
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
@@ -52,6 +44,13 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'recipe__name',)
 
 
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount',)
+    search_fields = ('user__username', 'ingredient__name',)
+    raw_id_fields = ('user', 'ingredient',)
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug',)
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+# The auto-created `Recipe.tags` through model can not declare indexes,
+# its unique (recipe_id, tag_id) index serves lookups by recipe, this one
+# serves tag filters scanning from the tag side.
+CREATE_TAGS_INDEX = (
+    'CREATE INDEX recipe_tags_tag_recipe_idx '
+    'ON recipes_recipe_tags (tag_id, recipe_id);'
+)
+DROP_TAGS_INDEX = 'DROP INDEX IF EXISTS recipe_tags_tag_recipe_idx;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunSQL(CREATE_TAGS_INDEX, DROP_TAGS_INDEX),
+    ]
@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
 
 from common.constants import (LENGTH_32, LENGTH_64, LENGTH_128, LENGTH_256,
                               MAX_VALUE, MIN_VALUE, SLUG_REGEX)
+from common.models import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -107,7 +110,7 @@ class IngredientRecipe(models.Model):
         )
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         verbose_name='Рецепт',
         max_length=LENGTH_256
@@ -119,6 +122,12 @@ class Recipe(models.Model):
         verbose_name='Изображение рецепта',
         upload_to='recipes/'
     )
+    image_variants = models.JSONField(
+        verbose_name='Варианты изображения',
+        null=True,
+        blank=True,
+        editable=False
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор рецепта',
@@ -153,12 +162,44 @@ class Recipe(models.Model):
         null=True,
         blank=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в корзину',
+        default=0,
+        editable=False
+    )
+    # Filled by a database trigger on PostgreSQL from name and text.
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
         default_related_name = 'recipes'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Рецепт "{self.name}" от автора: "{self.author.username}".'
@@ -228,3 +269,46 @@ class ShoppingCart(models.Model):
             f'рецепт "{self.recipe}" '
             'в корзинуА.'
         )
+
+
+class ShoppingListItem(models.Model):
+    """
+    Denormalized ingredient totals of user's shopping cart.
+
+    Rows are kept in sync with `ShoppingCart` and recipe ingredients
+    incrementally, see `api.utils.update_shopping_list`.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Чей список покупок',
+        on_delete=models.CASCADE,
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        verbose_name = 'ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ('user', 'ingredient',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient',),
+                name='unique_shopping_list_item',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'Пользователю "{self.user}" нужно '
+            f'"{self.amount}" "{self.ingredient.measurement_unit}" '
+            f'"{self.ingredient.name}"'
+        )
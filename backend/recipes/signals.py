@@ -1,44 +1,92 @@
 import logging
-import os
 
-from django.db.models.signals import post_delete, pre_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
 from django.dispatch import receiver
 
-from .models import Recipe
+from common.enums import RecipeFields
+from common.images import (get_replaced_image_name, remember_image_name,
+                           schedule_image_deletion)
+from common.utils import update_counter
+from .models import FavoriteRecipe, Recipe, ShoppingCart
+
+User = get_user_model()
 
 logger = logging.getLogger(__name__)
 
 
+@receiver(post_init, sender=Recipe)
+def remember_original_image(sender, instance, **kwargs):
+    remember_image_name(instance, RecipeFields.IMAGE.value)
+
+
 @receiver(post_delete, sender=Recipe)
 def delete_avatar_on_user_delete(sender, instance, **kwargs):
     """Delete file with recipe image if recipe is being deleted."""
     logger.info(f'Deleting image for recipe: {instance.name}')
-    if instance.image:
-        if os.path.isfile(instance.image.path):
-            logger.info(f'Removing file at: {instance.image.path}')
-            instance.image.delete(save=False)
+    schedule_image_deletion(instance.image.storage, instance.image.name)
 
 
 @receiver(pre_save, sender=Recipe)
-def delete_old_avatar_on_change(sender, instance, **kwargs):
+def delete_old_avatar_on_change(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
     """
     Delete file with recipe image.
 
     Cases:
     - current recipe image is being deleted;
     - current recipe image is being changed.
+
+    Old image name is remembered when the recipe is loaded, so no query
+    is needed, the file is deleted in background after commit.
     """
-    if not instance.pk:
+    if raw:
         return
 
-    if Recipe.objects.filter(pk=instance.pk).exists():
-        old_image = Recipe.objects.get(pk=instance.pk).image
-        new_image = instance.image
+    old_image_name = get_replaced_image_name(
+        instance, RecipeFields.IMAGE.value, update_fields
+    )
+    if old_image_name:
+        schedule_image_deletion(instance.image.storage, old_image_name)
+
+
+@receiver(post_save, sender=Recipe)
+def remember_saved_image(sender, instance, **kwargs):
+    remember_image_name(instance, RecipeFields.IMAGE.value)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def increment_favorites_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def decrement_favorites_count(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_shopping_cart_count(
+    sender, instance, created, raw=False, **kwargs
+):
+    if created and not raw:
+        update_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
 
-        if (
-            old_image
-            and old_image != new_image
-            and os.path.isfile(old_image.path)
-        ):
 
-            old_image.delete(save=False)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_shopping_cart_count(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
@@ -17,6 +17,8 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'is_staff',
         'avatar',
+        'recipes_count',
+        'followers_count',
     )
     list_editable = (
         'is_staff',
@@ -3,9 +3,10 @@ from django.core.validators import RegexValidator
 from django.db import models
 
 from common.constants import LENGTH_150, LENGTH_254, USERNAME_REGEX
+from common.models import CounterFieldsMixin
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
 
     email = models.EmailField(
         verbose_name='Эл. почта',
@@ -40,6 +41,23 @@ class User(AbstractUser):
         null=True,
         blank=True
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Варианты аватара',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    counter_fields = ('recipes_count', 'followers_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
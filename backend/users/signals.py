@@ -1,39 +1,63 @@
-import os
-
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
 from django.dispatch import receiver
 
+from common.enums import UserFields
+from common.images import (get_replaced_image_name, remember_image_name,
+                           schedule_image_deletion)
+from common.utils import update_counter
+from .models import FollowUser
+
 User = get_user_model()
 
 
+@receiver(post_init, sender=User)
+def remember_original_avatar(sender, instance, **kwargs):
+    remember_image_name(instance, UserFields.AVATAR.value)
+
+
 @receiver(post_delete, sender=User)
 def delete_avatar_on_user_delete(sender, instance, **kwargs):
     """Delete image file with avatar if user is being deleted."""
-    if instance.avatar:
-        if os.path.isfile(instance.avatar.path):
-            instance.avatar.delete(save=False)
+    schedule_image_deletion(instance.avatar.storage, instance.avatar.name)
 
 
 @receiver(pre_save, sender=User)
-def delete_old_avatar_on_change(sender, instance, **kwargs):
+def delete_old_avatar_on_change(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
     """
     Delete image file with avatar.
 
     Cases:
     - user deletes current avatar;
     - user changes current avatar.
+
+    Saves which do not touch the avatar (e.g. `last_login` update) cost
+    no extra queries, the old file is deleted in background after commit.
     """
-    if not instance.pk:
+    if raw:
         return
 
-    if User.objects.filter(pk=instance.pk).exists():
-        old_avatar = User.objects.get(pk=instance.pk).avatar
-        new_avatar = instance.avatar
+    old_avatar_name = get_replaced_image_name(
+        instance, UserFields.AVATAR.value, update_fields
+    )
+    if old_avatar_name:
+        schedule_image_deletion(instance.avatar.storage, old_avatar_name)
+
+
+@receiver(post_save, sender=User)
+def remember_saved_avatar(sender, instance, **kwargs):
+    remember_image_name(instance, UserFields.AVATAR.value)
+
+
+@receiver(post_save, sender=FollowUser)
+def increment_followers_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counter(User, instance.author_id, 'followers_count', 1)
+
 
-        if (
-            old_avatar
-            and old_avatar != new_avatar
-            and os.path.isfile(old_avatar.path)
-        ):
-            old_avatar.delete(save=False)
+@receiver(post_delete, sender=FollowUser)
+def decrement_followers_count(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'followers_count', -1)